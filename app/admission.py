@@ -0,0 +1,217 @@
+import os
+import time
+import asyncio
+from collections import deque
+
+from starlette.responses import JSONResponse
+
+# Limites configurables par variables d'environnement
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+# Taille maximale des corps de requete tels que recus (~512 octets de JSON
+# par ligne de batch), verifiee avant que l'application ne lise le corps
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(MAX_BATCH_ROWS * 512)))
+MAX_PREDICT_BYTES = int(os.getenv("MAX_PREDICT_BYTES", str(64 * 1024)))
+MAX_CONCURRENT_BATCH = int(os.getenv("MAX_CONCURRENT_BATCH", "2"))
+MAX_QUEUED_BATCH = int(os.getenv("MAX_QUEUED_BATCH", "4"))
+MAX_CONCURRENT_PREDICT = int(os.getenv("MAX_CONCURRENT_PREDICT", "32"))
+MAX_QUEUED_PREDICT = int(os.getenv("MAX_QUEUED_PREDICT", "64"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "5"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+
+
+class Rejected(Exception):
+    """Requete refusee : file d'attente pleine ou attente trop longue"""
+
+
+class BodyTooLarge(Exception):
+    """Corps de requete au-dela de max_body_bytes"""
+
+
+class AdmissionLimiter:
+    """
+    Limite le nombre de requetes en cours pour un endpoint.
+
+    Au-dela de max_concurrent les requetes attendent dans une file FIFO
+    bornee a max_queued ; au-dela elles sont rejetees immediatement.
+    Toutes les operations ont lieu dans la boucle asyncio du worker.
+    """
+
+    def __init__(self, name, max_concurrent, max_queued, queue_timeout=QUEUE_TIMEOUT_SECONDS,
+                 max_body_bytes=MAX_BATCH_BYTES):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.max_body_bytes = max_body_bytes
+        self.in_flight = 0
+        self._waiters = deque()
+        self.admitted = 0
+        self.shed = 0
+        self.too_large = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    async def acquire(self):
+        start = time.perf_counter()
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+        elif len(self._waiters) >= self.max_queued:
+            self.shed += 1
+            raise Rejected(self.name)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                # release() transfere directement le slot au waiter
+                await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if waiter.done():
+                    self.release()
+                else:
+                    waiter.cancel()
+                    self._waiters.remove(waiter)
+                self.shed += 1
+                raise Rejected(self.name)
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+
+        wait = time.perf_counter() - start
+        self.admitted += 1
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "too_large": self.too_large,
+            "max_body_bytes": self.max_body_bytes,
+            "queue_wait_avg_ms": round(1000 * self.queue_wait_total / self.admitted, 3) if self.admitted else 0.0,
+            "queue_wait_max_ms": round(1000 * self.queue_wait_max, 3),
+        }
+
+
+limiters = {
+    "/predict": AdmissionLimiter("/predict", MAX_CONCURRENT_PREDICT, MAX_QUEUED_PREDICT,
+                                 max_body_bytes=MAX_PREDICT_BYTES),
+    "/predict/batch": AdmissionLimiter("/predict/batch", MAX_CONCURRENT_BATCH, MAX_QUEUED_BATCH),
+}
+# Le scoring par identifiant partage les budgets existants
+limiters["/predict/customers"] = limiters["/predict/batch"]
+
+
+def limiter_for(path):
+    """Limiteur applicable a un chemin (/customers/{id}/predict -> /predict)"""
+    if path.startswith("/customers/") and path.endswith("/predict"):
+        return limiters["/predict"]
+    return limiters.get(path)
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI appliquant les limites avant la lecture du corps de la
+    requete : un gros batch en attente n'occupe ni le threadpool ni la memoire.
+
+    Le corps est ensuite lu ici en comptant les octets (Content-Length ou
+    transfert chunked) : un corps trop gros est rejete en 413 avant que
+    l'application ne le decode sur la boucle asyncio.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() \
+                and int(content_length) > limiter.max_body_bytes:
+            limiter.too_large += 1
+            await self._too_large(limiter, scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Rejected:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": f"Trop de requetes en cours sur {limiter.name}"},
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            try:
+                body = await self._read_body(limiter, receive)
+            except BodyTooLarge:
+                limiter.too_large += 1
+                await self._too_large(limiter, scope, receive, send)
+                return
+            if body is None:
+                return  # client deconnecte
+
+            sent = False
+
+            async def receive_body():
+                nonlocal sent
+                if not sent:
+                    sent = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            await self.app(scope, receive_body, send)
+        finally:
+            limiter.release()
+
+    @staticmethod
+    async def _read_body(limiter, receive):
+        chunks, size = [], 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limiter.max_body_bytes:
+                raise BodyTooLarge()
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _too_large(limiter, scope, receive, send):
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"Corps de requete trop volumineux pour {limiter.name} "
+                               f"(max {limiter.max_body_bytes} octets)"},
+        )
+        await response(scope, receive, send)
+
+
+def admission_stats() -> dict:
+    return {
+        "max_batch_rows": MAX_BATCH_ROWS,
+        "max_batch_bytes": MAX_BATCH_BYTES,
+        "endpoints": {limiter.name: limiter.stats() for limiter in limiters.values()},
+    }
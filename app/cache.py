@@ -0,0 +1,170 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Par defaut la base vit dans /dev/shm (memoire partagee) : tous les workers
+# uvicorn d'une meme machine lisent et ecrivent le meme fichier.
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "/dev/shm/bank_churn_cache.db")
+SHARED_CACHE_SNAPSHOT = os.getenv("SHARED_CACHE_SNAPSHOT", "cache/prediction_cache.db")
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "100000"))
+
+
+def model_version(model_path: str) -> str:
+    """Empreinte du fichier modele, utilisee dans la cle du cache"""
+    if os.path.isdir(model_path):
+        # Format mmap (app/mmap_model.py) : meme version que le pickle d'origine
+        with open(os.path.join(model_path, "meta.json")) as f:
+            source_version = json.load(f).get("source_version")
+        if source_version:
+            return source_version
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(model_path)):
+            digest.update(model_version(os.path.join(model_path, name)).encode())
+        return digest.hexdigest()[:16]
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class SharedPredictionCache:
+    """
+    Cache de predictions partage entre les processus d'une machine.
+
+    Les entrees sont stockees dans une base SQLite (mode WAL) indexee par
+    (version du modele, hash des features). La base est copiee sur disque
+    a l'arret et rechargee au demarrage si la memoire partagee est vide.
+    """
+
+    def __init__(self, path=SHARED_CACHE_PATH, snapshot_path=SHARED_CACHE_SNAPSHOT,
+                 max_entries=SHARED_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        self._restore_snapshot()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " model_version TEXT NOT NULL,"
+            " features_hash TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " PRIMARY KEY (model_version, features_hash))"
+        )
+        self._conn.commit()
+
+    def _restore_snapshot(self):
+        """Recharge le snapshot si aucun autre worker n'a deja cree la base"""
+        if os.path.exists(self.path) or not self.snapshot_path:
+            return
+        if not os.path.exists(self.snapshot_path):
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(self.snapshot_path, tmp_path)
+            # os.link echoue si un autre worker a gagne la course
+            os.link(tmp_path, self.path)
+            logger.info(f"Cache partage restaure depuis {self.snapshot_path}")
+        except FileExistsError:
+            pass
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get(self, version: str, features_hash: str):
+        # Une erreur SQLite (base verrouillee, /dev/shm plein...) ne doit
+        # jamais faire echouer une prediction : l'appelant passe au modele
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT result FROM predictions WHERE model_version = ? AND features_hash = ?",
+                    (version, features_hash),
+                ).fetchone()
+        except sqlite3.Error as e:
+            self._error("lecture", e)
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, version: str, features_hash: str, result: dict):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                    (version, features_hash, json.dumps(result)),
+                )
+                self._conn.commit()
+                self._puts += 1
+                if self._puts % 1000 == 0:
+                    self._evict()
+        except sqlite3.Error as e:
+            self._error("ecriture", e)
+
+    def _error(self, operation, error):
+        self.errors += 1
+        logger.warning(f"Cache partage indisponible ({operation}) : {error}")
+
+    def _evict(self):
+        """Supprime les entrees les plus anciennes au-dela de max_entries"""
+        count = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM predictions WHERE rowid IN "
+                "(SELECT rowid FROM predictions ORDER BY rowid LIMIT ?)",
+                (excess,),
+            )
+            self._conn.commit()
+
+    def snapshot(self):
+        """Copie la base sur disque (ecriture atomique)"""
+        if not self.snapshot_path:
+            return
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with self._lock:
+            target = sqlite3.connect(tmp_path)
+            try:
+                self._conn.backup(target)
+            finally:
+                target.close()
+        os.replace(tmp_path, self.snapshot_path)
+        logger.info(f"Cache partage sauvegarde dans {self.snapshot_path}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        try:
+            with self._lock:
+                size = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        except sqlite3.Error as e:
+            self._error("stats", e)
+            size = None
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": size,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,164 @@
+import os
+import zlib
+
+from starlette.responses import JSONResponse
+
+from app.admission import MAX_BATCH_BYTES, limiter_for
+
+try:
+    import zstandard
+except ImportError:  # zstd optionnel : seules les requetes gzip sont acceptees
+    zstandard = None
+
+# Taille maximale d'un corps de requete une fois decompresse pour les
+# chemins sans limiteur ; sinon le budget max_body_bytes du limiteur
+# (ex. 64 Ko sur /predict) : protege contre les bombes de decompression
+MAX_DECOMPRESSED_BYTES = int(os.getenv("MAX_DECOMPRESSED_BYTES", str(MAX_BATCH_BYTES)))
+# Les reponses plus petites ne sont pas compressees (ex. /predict)
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+DECOMPRESS_CHUNK_BYTES = 64 * 1024
+
+
+class PayloadTooLarge(Exception):
+    """Corps decompresse au-dela de MAX_DECOMPRESSED_BYTES"""
+
+
+class InvalidPayload(Exception):
+    """Flux compresse corrompu ou tronque"""
+
+
+class _LimitedBuffer:
+    """Accumule la sortie du decompresseur et s'arrete des que la limite est depassee"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.data = bytearray()
+
+    def write(self, chunk):
+        if len(self.data) + len(chunk) > self.limit:
+            raise PayloadTooLarge()
+        self.data += chunk
+        return len(chunk)
+
+
+class _GzipDecoder:
+    def __init__(self, output):
+        self.output = output
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def feed(self, data):
+        # max_length borne la sortie de chaque appel : la limite est
+        # verifiee tous les DECOMPRESS_CHUNK_BYTES octets produits
+        while data:
+            try:
+                self.output.write(self._decompressor.decompress(data, DECOMPRESS_CHUNK_BYTES))
+            except zlib.error as e:
+                raise InvalidPayload(str(e))
+            data = self._decompressor.unconsumed_tail
+
+    def finish(self):
+        if not self._decompressor.eof:
+            raise InvalidPayload("flux gzip tronque")
+
+
+class _ZstdDecoder:
+    # decompressobj n'a pas de max_length : l'entree est decoupee en petites
+    # tranches. Un bloc zstd (>= 4 octets compresses) produit au plus 128 Ko,
+    # la sortie d'une tranche est donc bornee (4 Mo) avant le controle de taille
+    INPUT_SLICE_BYTES = 128
+
+    def __init__(self, output):
+        self.output = output
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj(write_size=DECOMPRESS_CHUNK_BYTES)
+
+    def feed(self, data):
+        try:
+            for start in range(0, len(data), self.INPUT_SLICE_BYTES):
+                self.output.write(self._decompressor.decompress(data[start:start + self.INPUT_SLICE_BYTES]))
+        except zstandard.ZstdError as e:
+            raise InvalidPayload(str(e))
+
+    def finish(self):
+        if not self._decompressor.eof:
+            raise InvalidPayload("flux zstd tronque")
+
+
+DECODERS = {"gzip": _GzipDecoder, "x-gzip": _GzipDecoder}
+if zstandard is not None:
+    DECODERS["zstd"] = _ZstdDecoder
+
+
+class DecompressionMiddleware:
+    """
+    Middleware ASGI decompressant les corps de requete gzip / zstd
+    (Content-Encoding) au fil de la reception, avant la lecture du JSON.
+    413 au-dela du budget du limiteur de l'endpoint (MAX_DECOMPRESSED_BYTES
+    pour les autres chemins), 415 pour un encodage inconnu.
+    """
+
+    def __init__(self, app, max_bytes=MAX_DECOMPRESSED_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = headers.get(b"content-encoding", b"identity").decode("latin-1").strip().lower()
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        if encoding not in DECODERS:
+            response = JSONResponse(
+                status_code=415,
+                content={"detail": f"Content-Encoding non supporte : {encoding}"},
+                headers={"Accept-Encoding": ", ".join(DECODERS)},
+            )
+            await response(scope, receive, send)
+            return
+
+        limiter = limiter_for(scope["path"])
+        max_bytes = limiter.max_body_bytes if limiter is not None else self.max_bytes
+        output = _LimitedBuffer(max_bytes)
+        decoder = DECODERS[encoding](output)
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                decoder.feed(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            decoder.finish()
+        except PayloadTooLarge:
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": f"Corps decompresse trop volumineux (max {max_bytes} octets)"},
+            )
+            await response(scope, receive, send)
+            return
+        except InvalidPayload as e:
+            response = JSONResponse(status_code=400, content={"detail": f"Corps {encoding} invalide : {e}"})
+            await response(scope, receive, send)
+            return
+
+        body = bytes(output.data)
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+
+        sent = False
+
+        async def receive_decompressed():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_decompressed, send)
@@ -1,34 +1,257 @@
-import matplotlib
-matplotlib.use("Agg")  # OBLIGATOIRE pour Docker / Azure
-
 import pandas as pd
 import numpy as np
-from scipy.stats import ks_2samp
+from pandas.api.types import is_numeric_dtype
+from scipy.stats import chi2, kstwo
 import json
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+
+# Au-dela de ce nombre de modalites une colonne est traitee comme continue
+MAX_CATEGORIES = 10
+PSI_BINS = 10
+PSI_EPS = 1e-4
+
+GEOGRAPHY_SEGMENTS = ["France", "Germany", "Spain"]
+
+
+def _psi(ref_counts, prod_counts):
+    """Population Stability Index entre deux histogrammes"""
+    r = np.clip(ref_counts / max(ref_counts.sum(), 1), PSI_EPS, None)
+    p = np.clip(prod_counts / max(prod_counts.sum(), 1), PSI_EPS, None)
+    return float(np.sum((p - r) * np.log(p / r)))
+
+
+def _continuous_stats(ref_sorted, prod_sorted):
+    """KS, Wasserstein et PSI calcules a partir des deux echantillons tries"""
+    n, m = len(ref_sorted), len(prod_sorted)
+    # Fusion de deux sequences deja triees : lineaire avec un tri stable
+    pooled = np.concatenate([ref_sorted, prod_sorted])
+    order = np.argsort(pooled, kind="stable")
+    pooled = pooled[order]
+    ref_cum = np.cumsum(order < n)
+    # Les FDR sont evaluees sur la derniere occurrence de chaque valeur
+    last = np.concatenate([pooled[1:] != pooled[:-1], [True]])
+    pooled = pooled[last]
+    cdf_ref = ref_cum[last] / n
+    cdf_prod = (np.flatnonzero(last) + 1 - ref_cum[last]) / m
+    gap = np.abs(cdf_ref - cdf_prod)
+
+    ks = float(gap.max())
+    p_value = float(kstwo.sf(ks, np.round(n * m / (n + m))))
+    wasserstein = float(np.sum(gap[:-1] * np.diff(pooled)))
+
+    # Bins PSI sur les quantiles de la reference (lus directement dans le tri)
+    edges = np.unique(ref_sorted[(np.arange(1, PSI_BINS) * n) // PSI_BINS])
+    ref_cum = np.concatenate([[0], np.searchsorted(ref_sorted, edges, side="right"), [n]])
+    prod_cum = np.concatenate([[0], np.searchsorted(prod_sorted, edges, side="right"), [m]])
+
+    return {
+        "test": "ks",
+        "statistic": ks,
+        "p_value": p_value,
+        "psi": _psi(np.diff(ref_cum), np.diff(prod_cum)),
+        "wasserstein": wasserstein,
+    }
+
+
+def _categorical_stats(ref_counts, prod_counts):
+    """Chi-deux d'homogeneite et PSI sur les frequences des modalites"""
+    present = (ref_counts + prod_counts) > 0
+    table = np.vstack([ref_counts[present], prod_counts[present]]).astype(float)
+    if table.shape[1] < 2:
+        statistic, p_value = 0.0, 1.0
+    else:
+        expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0) / table.sum()
+        statistic = float(np.sum((table - expected) ** 2 / expected))
+        p_value = float(chi2.sf(statistic, table.shape[1] - 1))
+    return {
+        "test": "chi2",
+        "statistic": statistic,
+        "p_value": p_value,
+        "psi": _psi(table[0], table[1]),
+    }
+
+
+def _category_counts(sorted_values, categories):
+    """Effectif de chaque modalite dans un echantillon trie"""
+    left = np.searchsorted(sorted_values, categories, side="left")
+    right = np.searchsorted(sorted_values, categories, side="right")
+    return right - left
+
+
+def _sort_by_segment(values, segments, n_segments):
+    """
+    Un seul tri par colonne : le tri par valeur donne l'echantillon global
+    trie, puis un regroupement stable par segment (tri radix sur de petits
+    entiers) rend chaque segment contigu et deja trie.
+    """
+    order = np.argsort(values)
+    global_sorted = values[order]
+    order = order[np.argsort(segments[order], kind="stable")]
+    bounds = np.searchsorted(segments[order], np.arange(n_segments + 1))
+    return global_sorted, values[order], bounds
+
+
+def _column_stats(ref_sorted, prod_sorted, categories):
+    if len(ref_sorted) == 0 or len(prod_sorted) == 0:
+        return None
+    if categories is not None:
+        return _categorical_stats(
+            _category_counts(ref_sorted, categories),
+            _category_counts(prod_sorted, categories),
+        )
+    return _continuous_stats(ref_sorted, prod_sorted)
 
-def detect_drift(reference_file, production_file, threshold=0.05, output_dir="drift_reports"):
+
+def _statistic(ref, prod, categories):
+    stats = _column_stats(np.sort(ref), np.sort(prod), categories)
+    return stats["statistic"]
+
+
+def _permutation_p_value(ref, prod, categories, observed, n_permutations, seed):
+    """p-value par permutation de la statistique principale de la colonne"""
+    rng = np.random.default_rng(seed)
+    pooled = np.concatenate([ref, prod])
+    exceed = 0
+    for _ in range(n_permutations):
+        rng.shuffle(pooled)
+        if _statistic(pooled[:len(ref)], pooled[len(ref):], categories) >= observed:
+            exceed += 1
+    return (exceed + 1) / (n_permutations + 1)
+
+
+def _segment_codes(df, segment_by):
+    """Codes entiers du segment de chaque ligne et noms des segments"""
+    if segment_by == "Geography" and {"Geography_Germany", "Geography_Spain"} <= set(df.columns):
+        codes = np.zeros(len(df), dtype=np.int8)
+        codes[df["Geography_Germany"].to_numpy() == 1] = 1
+        codes[df["Geography_Spain"].to_numpy() == 1] = 2
+        return codes, GEOGRAPHY_SEGMENTS, ["Geography_Germany", "Geography_Spain"]
+    if segment_by in df.columns:
+        return None, None, [segment_by]
+    return None, None, []
+
+
+def detect_drift(reference_file, production_file, threshold=0.05, output_dir="drift_reports",
+                 segment_by="Geography", n_permutations=0, n_jobs=None):
+    """
+    Detecte le drift colonne par colonne entre reference et production.
+
+    Chaque colonne est triee une seule fois ; KS, PSI et Wasserstein sont
+    calcules sur les colonnes continues, chi-deux et PSI sur les colonnes
+    binaires ou a peu de modalites. Le drift par segment (geographie par
+    defaut) est calcule dans la meme passe. Si n_permutations > 0, une
+    p-value par permutation est calculee dans un pool de processus.
+    """
     os.makedirs(output_dir, exist_ok=True)
 
     ref = pd.read_csv(reference_file)
     prod = pd.read_csv(production_file)
 
+    ref_segments, segment_names, segment_columns = _segment_codes(ref, segment_by)
+    prod_segments, _, _ = _segment_codes(prod, segment_by)
+    if ref_segments is None or prod_segments is None:
+        ref_segments = prod_segments = None
+        if segment_by in ref.columns and segment_by in prod.columns:
+            # Segment arbitraire : modalites des deux fichiers
+            segment_columns = [segment_by]
+            segment_names = sorted(set(ref[segment_by].dropna()) | set(prod[segment_by].dropna()), key=str)
+            lookup = {name: i for i, name in enumerate(segment_names)}
+            ref_segments = ref[segment_by].map(lookup).fillna(-1).to_numpy(dtype=np.int64)
+            prod_segments = prod[segment_by].map(lookup).fillna(-1).to_numpy(dtype=np.int64)
+        # Segmentation impossible d'un cote ou de l'autre : drift global seulement
+
     results = {}
+    samples = {}
 
     for col in ref.columns:
-        if col != "Exited" and col in prod.columns:
-            stat, p = ks_2samp(ref[col].dropna(), prod[col].dropna())
-            results[col] = {
-                "p_value": float(p),
-                "statistic": float(stat),
-                "drift_detected": bool(p < threshold)
+        if col == "Exited" or col not in prod.columns:
+            continue
+        # Colonnes non numeriques (ex. segment brut "Geography") : pas de test
+        if not (is_numeric_dtype(ref[col]) and is_numeric_dtype(prod[col])):
+            continue
+
+        ref_values = ref[col].to_numpy(dtype=np.float64)
+        prod_values = prod[col].to_numpy(dtype=np.float64)
+        ref_mask = ~np.isnan(ref_values)
+        prod_mask = ~np.isnan(prod_values)
+        ref_values, prod_values = ref_values[ref_mask], prod_values[prod_mask]
+
+        segmented = ref_segments is not None and col not in segment_columns
+        if segmented:
+            n_segments = len(segment_names)
+            ref_sorted, ref_sorted_seg, ref_bounds = _sort_by_segment(
+                ref_values, ref_segments[ref_mask], n_segments
+            )
+            prod_sorted, prod_sorted_seg, prod_bounds = _sort_by_segment(
+                prod_values, prod_segments[prod_mask], n_segments
+            )
+        else:
+            ref_sorted = np.sort(ref_values)
+            prod_sorted = np.sort(prod_values)
+
+        # Nombre de modalites lu sur le tri de la reference
+        n_unique = int(np.count_nonzero(np.diff(ref_sorted))) + 1 if len(ref_sorted) else 0
+        categories = None
+        if n_unique <= MAX_CATEGORIES:
+            categories = np.union1d(
+                ref_sorted[np.concatenate([[True], np.diff(ref_sorted) != 0])],
+                np.unique(prod_sorted)
+            )
+
+        stats = _column_stats(ref_sorted, prod_sorted, categories)
+        if stats is None:
+            continue
+
+        entry = {
+            "p_value": stats["p_value"],
+            "statistic": stats["statistic"],
+            "drift_detected": bool(stats["p_value"] < threshold),
+            "test": stats["test"],
+            "psi": stats["psi"],
+        }
+        if "wasserstein" in stats:
+            entry["wasserstein"] = stats["wasserstein"]
+        entry["n_reference"] = int(len(ref_sorted))
+        entry["n_production"] = int(len(prod_sorted))
+
+        if segmented:
+            entry["segments"] = {}
+            for i, name in enumerate(segment_names):
+                seg_stats = _column_stats(
+                    ref_sorted_seg[ref_bounds[i]:ref_bounds[i + 1]],
+                    prod_sorted_seg[prod_bounds[i]:prod_bounds[i + 1]],
+                    categories,
+                )
+                if seg_stats is None:
+                    continue
+                entry["segments"][str(name)] = {
+                    "p_value": seg_stats["p_value"],
+                    "statistic": seg_stats["statistic"],
+                    "drift_detected": bool(seg_stats["p_value"] < threshold),
+                    "psi": seg_stats["psi"],
+                    "n_reference": int(ref_bounds[i + 1] - ref_bounds[i]),
+                    "n_production": int(prod_bounds[i + 1] - prod_bounds[i]),
+                }
+
+        results[col] = entry
+        samples[col] = (ref_values, prod_values, categories)
+
+    if n_permutations > 0:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = {
+                col: pool.submit(
+                    _permutation_p_value, ref_values, prod_values, categories,
+                    results[col]["statistic"], n_permutations, seed
+                )
+                for seed, (col, (ref_values, prod_values, categories)) in enumerate(samples.items())
             }
+            for col, future in futures.items():
+                results[col]["permutation_p_value"] = future.result()
 
     report_path = f"{output_dir}/drift_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     with open(report_path, "w") as f:
         json.dump(results, f, indent=2)
 
-    return results
\ No newline at end of file
+    return results
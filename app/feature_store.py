@@ -0,0 +1,307 @@
+"""
+Feature store local indexe par identifiant client.
+
+Les features sont stockees colonne par colonne en .npy types (memory-map),
+avec une table de hachage a adressage ouvert (sondage lineaire) de
+l'identifiant client vers la ligne. Les lectures rassemblent directement
+les lignes demandees dans la matrice d'entree du modele. Les mises a jour
+modifient les lignes en place et ajoutent les nouveaux clients en fin de
+colonne ; les fichiers ne sont recrees que lorsque la capacite double.
+
+    python -m app.feature_store build data/production_data.csv
+    python -m app.feature_store upsert changed_customers.csv
+"""
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.models import CustomerFeatures, FEATURE_COLUMNS
+
+FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", "data/feature_store")
+ID_COLUMN = "CustomerId"
+EMPTY_KEY = np.iinfo(np.int64).min
+MAX_LOAD_FACTOR = 0.5
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+INT_COLUMNS = {name for name, field in CustomerFeatures.model_fields.items() if field.annotation is int}
+
+
+def _column_dtype(name, values):
+    """int32 pour les colonnes entieres du schema si les valeurs le sont, float64 sinon"""
+    if name in INT_COLUMNS and np.array_equal(values, np.round(values)):
+        return np.int32
+    return np.float64
+
+
+def _slots(keys, table_size):
+    """Hachage de Fibonacci des identifiants vers une case de la table"""
+    bits = np.uint64(64 - int(table_size).bit_length() + 1)
+    return ((keys.astype(np.uint64) * HASH_MULTIPLIER) >> bits).astype(np.int64)
+
+
+def _table_size(n_keys):
+    size = 16
+    while n_keys > size * MAX_LOAD_FACTOR:
+        size *= 2
+    return size
+
+
+def _empty_index(table_size):
+    """
+    Index (table_size, 2) : identifiant en colonne 0, ligne en colonne 1.
+    Un seul fichier, remplace d'un bloc : cles et lignes restent coherentes.
+    """
+    index = np.empty((table_size, 2), dtype=np.int64)
+    index[:, 0] = EMPTY_KEY
+    index[:, 1] = -1
+    return index
+
+
+def _insert(index_keys, index_rows, keys, rows):
+    """
+    Insertion vectorisee : a chaque tour, les cles en attente tentent leur
+    case courante ; une seule cle gagne par case libre, les autres avancent.
+    """
+    table_size = len(index_keys)
+    slots = _slots(keys, table_size)
+    while len(keys):
+        free = index_keys[slots] == EMPTY_KEY
+        _, first = np.unique(np.where(free, slots, -1), return_index=True)
+        winners = np.zeros(len(keys), dtype=bool)
+        winners[first] = True
+        winners &= free
+        index_keys[slots[winners]] = keys[winners]
+        index_rows[slots[winners]] = rows[winners]
+        keys, rows = keys[~winners], rows[~winners]
+        slots = (slots[~winners] + 1) & (table_size - 1)
+
+
+def _lookup(index_keys, index_rows, keys):
+    """Ligne de chaque identifiant, -1 si absent (sondage lineaire vectorise)"""
+    table_size = len(index_keys)
+    rows = np.full(len(keys), -1, dtype=np.int64)
+    pending = np.arange(len(keys))
+    slots = _slots(keys, table_size)
+    while len(pending):
+        found = index_keys[slots] == keys[pending]
+        rows[pending[found]] = index_rows[slots[found]]
+        active = ~found & (index_keys[slots] != EMPTY_KEY)
+        pending = pending[active]
+        slots = (slots[active] + 1) & (table_size - 1)
+    return rows
+
+
+def _write_array(directory, name, array):
+    tmp_path = os.path.join(directory, f"{name}.tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, os.path.join(directory, f"{name}.npy"))
+
+
+def _write_meta(directory, meta):
+    tmp_path = os.path.join(directory, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, "meta.json"))
+
+
+def build(df, directory=FEATURE_STORE_PATH, id_column=ID_COLUMN):
+    """Construit le store a partir d'un DataFrame (ids = numero de ligne si absents)"""
+    os.makedirs(directory, exist_ok=True)
+    if id_column in df.columns:
+        ids = df[id_column].to_numpy(dtype=np.int64)
+    else:
+        ids = np.arange(len(df), dtype=np.int64)
+    if len(np.unique(ids)) != len(ids):
+        raise ValueError("Identifiants clients dupliques")
+
+    capacity = max(16, len(ids))
+    _write_array(directory, "ids", np.resize(ids, capacity))
+    for col in FEATURE_COLUMNS:
+        values = df[col].to_numpy()
+        column = np.zeros(capacity, dtype=_column_dtype(col, values))
+        column[:len(df)] = values
+        _write_array(directory, col, column)
+
+    table_size = _table_size(len(ids))
+    index = _empty_index(table_size)
+    _insert(index[:, 0], index[:, 1], ids, np.arange(len(ids), dtype=np.int64))
+    _write_array(directory, "index", index)
+
+    _write_meta(directory, {"n_rows": int(len(ids)), "capacity": capacity, "version": 1})
+    return FeatureStore(directory)
+
+
+class _Snapshot:
+    """Vue coherente du store (metadonnees et memory-maps d'une meme version)"""
+
+    def __init__(self, directory, mode):
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.n_rows = self.meta["n_rows"]
+
+        def load(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+
+        self.ids = load("ids")
+        self.columns = {col: load(col) for col in FEATURE_COLUMNS}
+        self.index = load("index")
+        self.index_keys = self.index[:, 0]
+        self.index_rows = self.index[:, 1]
+
+    def rows(self, keys):
+        rows = _lookup(self.index_keys, self.index_rows, keys)
+        # Lignes ajoutees par un ecrivain mais pas encore publiees dans meta.json
+        rows[rows >= self.n_rows] = -1
+        return rows
+
+
+class FeatureStore:
+    """
+    Acces en lecture (memory-map) et mises a jour incrementales du store.
+
+    Chaque rechargement construit un nouveau _Snapshot remplace en une seule
+    affectation : une lecture travaille sur un snapshot pris au debut et ne
+    melange jamais l'index d'une version avec les colonnes d'une autre.
+    """
+
+    def __init__(self, directory=FEATURE_STORE_PATH):
+        self.directory = directory
+        self._meta_mtime = None
+        self._reload()
+
+    def _reload(self, mode="r"):
+        meta_path = os.path.join(self.directory, "meta.json")
+        mtime = os.stat(meta_path).st_mtime_ns
+        self._snapshot = _Snapshot(self.directory, mode)
+        self._meta_mtime = mtime
+        return self._snapshot
+
+    def _current(self):
+        """Snapshot a jour (recharge si un autre processus a modifie le store)"""
+        mtime = os.stat(os.path.join(self.directory, "meta.json")).st_mtime_ns
+        if mtime != self._meta_mtime:
+            return self._reload()
+        return self._snapshot
+
+    @property
+    def meta(self):
+        return self._snapshot.meta
+
+    @property
+    def columns(self):
+        return self._snapshot.columns
+
+    def __len__(self):
+        return self._current().n_rows
+
+    def lookup(self, customer_ids):
+        """Ligne de chaque client, -1 si inconnu"""
+        return self._current().rows(np.asarray(customer_ids, dtype=np.int64))
+
+    def gather(self, customer_ids):
+        """
+        Matrice d'entree du modele (n, 10) pour les clients demandes et
+        masque des clients trouves (les lignes absentes restent a zero).
+        """
+        snapshot = self._current()
+        rows = snapshot.rows(np.asarray(customer_ids, dtype=np.int64))
+        found = rows >= 0
+        X = np.zeros((len(rows), len(FEATURE_COLUMNS)), dtype=np.float64)
+        for j, col in enumerate(FEATURE_COLUMNS):
+            X[found, j] = snapshot.columns[col][rows[found]]
+        return X, found
+
+    def upsert(self, df, id_column=ID_COLUMN):
+        """
+        Met a jour les clients existants en place et ajoute les nouveaux.
+        Un verrou fichier serialise les ecrivains ; les lecteurs des autres
+        processus rechargent a la prochaine requete.
+        """
+        import fcntl  # POSIX uniquement : seules les mises a jour en ont besoin
+
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            store = _Snapshot(self.directory, "r+")
+            ids = df[id_column].to_numpy(dtype=np.int64)
+            for col in FEATURE_COLUMNS:
+                if store.columns[col].dtype == np.int32 and _column_dtype(col, df[col].to_numpy()) != np.int32:
+                    raise ValueError(f"Valeurs non entieres pour la colonne {col}")
+            rows = store.rows(ids)
+            new = rows < 0
+            n_new = int(new.sum())
+            if n_new:
+                n_unique = len(np.unique(ids[new]))
+                if n_unique != n_new:
+                    raise ValueError("Identifiants clients dupliques")
+                store = self._grow(store, store.n_rows + n_new)
+                rows[new] = np.arange(store.n_rows, store.n_rows + n_new)
+                store.ids[rows[new]] = ids[new]
+
+            for col in FEATURE_COLUMNS:
+                store.columns[col][rows] = df[col].to_numpy()
+                store.columns[col].flush()
+            store.ids.flush()
+
+            if n_new:
+                _insert(store.index_keys, store.index_rows, ids[new], rows[new])
+                store.index.flush()
+
+            meta = {**store.meta, "n_rows": store.n_rows + n_new, "version": store.meta["version"] + 1}
+            _write_meta(self.directory, meta)
+            self._reload()
+        return {"updated": int(len(ids) - n_new), "inserted": n_new}
+
+    def _grow(self, store, n_rows):
+        """
+        Double la capacite des colonnes ou la taille de l'index si necessaire.
+        Les nouveaux fichiers remplacent les anciens par renommage : les
+        snapshots des lecteurs gardent leurs memory-maps sur les anciens.
+        """
+        meta = dict(store.meta)
+        capacity = meta["capacity"]
+        if n_rows > capacity:
+            while n_rows > capacity:
+                capacity *= 2
+            for name in ["ids"] + FEATURE_COLUMNS:
+                array = np.load(os.path.join(self.directory, f"{name}.npy"))
+                grown = np.zeros(capacity, dtype=array.dtype)
+                grown[:store.n_rows] = array[:store.n_rows]
+                _write_array(self.directory, name, grown)
+            meta["capacity"] = capacity
+
+        table_size = len(store.index_keys)
+        if n_rows > table_size * MAX_LOAD_FACTOR:
+            table_size = _table_size(n_rows)
+            index = _empty_index(table_size)
+            occupied = np.asarray(store.index_keys) != EMPTY_KEY
+            _insert(index[:, 0], index[:, 1], np.asarray(store.index_keys)[occupied],
+                    np.asarray(store.index_rows)[occupied])
+            _write_array(self.directory, "index", index)
+
+        # Meme nombre de lignes publie : les lecteurs rouvrent les nouveaux fichiers
+        _write_meta(self.directory, meta)
+        return _Snapshot(self.directory, "r+")
+
+    def stats(self) -> dict:
+        snapshot = self._current()
+        return {
+            "n_customers": snapshot.n_rows,
+            "capacity": snapshot.meta["capacity"],
+            "index_size": int(len(snapshot.index_keys)),
+            "version": snapshot.meta["version"],
+        }
+
+
+if __name__ == "__main__":
+    command, source = sys.argv[1], sys.argv[2]
+    if command == "build":
+        store = build(pd.read_csv(source))
+        print(f"✅ Feature store construit : {len(store)} clients dans {FEATURE_STORE_PATH}")
+    elif command == "upsert":
+        result = FeatureStore().upsert(pd.read_csv(source))
+        print(f"✅ {result['updated']} clients mis a jour, {result['inserted']} ajoutes")
+    else:
+        raise SystemExit(f"Commande inconnue : {command}")
@@ -4,15 +4,26 @@ import logging
 import os
 import hashlib
 import json
+import asyncio
 from functools import lru_cache
-import joblib
 import numpy as np
-from typing import List
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+import pandas as pd
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request, Depends, Header, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
-from app.models import CustomerFeatures, PredictionResponse
+from app.models import (
+    CustomerFeatures, PredictionResponse, FEATURE_COLUMNS, CustomerRecord, CustomerIdsRequest
+)
+from app.cache import SharedPredictionCache, model_version
+from app.admission import AdmissionMiddleware, MAX_BATCH_ROWS, admission_stats
+from app.compression import DecompressionMiddleware, COMPRESS_MIN_BYTES, COMPRESS_LEVEL
+from app.profiler import SamplingProfiler, PROFILE_MAX_SECONDS
+from app.parallel import ParallelPredictor
+from app.mmap_model import load_model, resolve_model_path
+from app.feature_store import FeatureStore, FEATURE_STORE_PATH
 
 # Statistiques de monitoring
 prediction_stats = {
@@ -30,15 +41,41 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Charge le modele au demarrage de l'API et nettoie a la fermeture"""
-    global model
+    global model, current_model_version, shared_cache, feature_store
     try:
-        model = joblib.load(MODEL_PATH)
-        logger.info(f"Modele charge avec succes depuis {MODEL_PATH}")
+        # Format mmap partage entre workers s'il existe, pickle sinon
+        model_file = resolve_model_path(MODEL_PATH)
+        model = load_model(model_file)
+        current_model_version = model_version(model_file)
+        predictor.configure(model)
+        predict_cached.cache_clear()
+        logger.info(f"Modele charge avec succes depuis {model_file}")
     except Exception as e:
         logger.error(f"Erreur lors du chargement du modele : {e}")
         model = None
+    if os.path.exists(os.path.join(FEATURE_STORE_PATH, "meta.json")):
+        try:
+            feature_store = FeatureStore(FEATURE_STORE_PATH)
+            logger.info(f"Feature store charge : {len(feature_store)} clients")
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement du feature store : {e}")
+            feature_store = None
+    if SHARED_CACHE_ENABLED:
+        try:
+            shared_cache = SharedPredictionCache()
+        except Exception as e:
+            logger.error(f"Cache partage indisponible : {e}")
+            shared_cache = None
     yield
     # Nettoyage si necessaire
+    if shared_cache is not None:
+        try:
+            shared_cache.snapshot()
+        except Exception as e:
+            logger.error(f"Erreur lors de la sauvegarde du cache : {e}")
+        shared_cache.close()
+        shared_cache = None
+    predictor.shutdown()
     logger.info("Arret de l'API")
 
 app = FastAPI(
@@ -59,9 +96,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression des reponses negociee (Accept-Encoding) au-dela de
+# COMPRESS_MIN_BYTES et decompression des corps de requete gzip / zstd
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES, compresslevel=COMPRESS_LEVEL)
+app.add_middleware(DecompressionMiddleware)
+
+# Controle d'admission : limite la concurrence par endpoint (429 au-dela)
+app.add_middleware(AdmissionMiddleware)
+
 # Chargement du modele au demarrage
 MODEL_PATH = os.getenv("MODEL_PATH", "model/churn_model.pkl")
 model = None
+current_model_version = "unknown"
+
+# Parallelisme intra-requete de l'inference (voir app/parallel.py)
+predictor = ParallelPredictor()
+
+# Features des clients connus, indexees par identifiant (voir app/feature_store.py)
+feature_store = None
+
+# Jeton requis pour les endpoints d'administration (desactives si absent)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+active_profiler = None
+
+# Cache partage entre workers (voir app/cache.py)
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true"
+shared_cache = None
 
 
 @app.get("/", tags=["General"])
@@ -93,7 +153,27 @@ def get_stats():
         "total_predictions": prediction_stats["total_predictions"],
         "total_batch_predictions": prediction_stats["total_batch_predictions"],
         "last_prediction": prediction_stats["last_prediction"],
-        "model_loaded": model is not None
+        "model_loaded": model is not None,
+        "model_version": current_model_version,
+        "cache": cache_stats(),
+        "admission": admission_stats(),
+        "parallelism": predictor.stats(),
+        "feature_store": feature_store.stats() if feature_store is not None else None
+    }
+
+def cache_stats():
+    """Taux de succes des deux niveaux de cache (local au worker et partage)"""
+    info = predict_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "local": {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+            "size": info.currsize,
+            "max_entries": info.maxsize
+        },
+        "shared": shared_cache.stats() if shared_cache is not None else None
     }
 
 def hash_features(features_dict: dict) -> str:
@@ -102,9 +182,29 @@ def hash_features(features_dict: dict) -> str:
         json.dumps(features_dict, sort_keys=True).encode()
     ).hexdigest()
 
-# Cache pour les predictions (1000 dernieres)
+def format_prediction(proba) -> dict:
+    """Probabilite, prediction binaire et niveau de risque"""
+    if proba < 0.3:
+        risk = "Low"
+    elif proba < 0.7:
+        risk = "Medium"
+    else:
+        risk = "High"
+    
+    return {
+        "churn_probability": round(float(proba), 4),
+        "prediction": int(proba > 0.5),
+        "risk_level": risk
+    }
+
+# Cache pour les predictions (1000 dernieres), devant le cache partage
 @lru_cache(maxsize=1000)
 def predict_cached(features_hash: str, features_json: str):
+    if shared_cache is not None:
+        result = shared_cache.get(current_model_version, features_hash)
+        if result is not None:
+            return result
+
     features_dict = json.loads(features_json)
     input_data = np.array([[
         features_dict["CreditScore"],
@@ -119,21 +219,11 @@ def predict_cached(features_hash: str, features_json: str):
         features_dict["Geography_Spain"]
     ]])
     
-    proba = model.predict_proba(input_data)[0, 1]
-    prediction = int(proba > 0.5)
-    
-    if proba < 0.3:
-        risk = "Low"
-    elif proba < 0.7:
-        risk = "Medium"
-    else:
-        risk = "High"
-    
-    return {
-        "churn_probability": round(float(proba), 4),
-        "prediction": prediction,
-        "risk_level": risk
-    }
+    proba = predictor.predict_proba(model, input_data)[0, 1]
+    result = format_prediction(proba)
+    if shared_cache is not None:
+        shared_cache.put(current_model_version, features_hash, result)
+    return result
 
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
 def predict(features: CustomerFeatures):
@@ -154,25 +244,24 @@ def predict_batch(features_list: List[CustomerFeatures]):
     """
     if model is None:
         raise HTTPException(status_code=503, detail="Modele non disponible")
+    if len(features_list) > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch trop volumineux : {len(features_list)} lignes (max {MAX_BATCH_ROWS})"
+        )
     
     try:
-        predictions = []
+        # Une seule matrice pour tout le batch, decoupee si elle est grande
+        input_data = np.array(
+            [[getattr(features, col) for col in FEATURE_COLUMNS] for features in features_list],
+            dtype=np.float64
+        ).reshape(len(features_list), len(FEATURE_COLUMNS))
+        probas = predictor.predict_proba(model, input_data)[:, 1] if len(features_list) else np.empty(0)
         
-        for features in features_list:
-            input_data = np.array([[
-                features.CreditScore, features.Age, features.Tenure,
-                features.Balance, features.NumOfProducts, features.HasCrCard,
-                features.IsActiveMember, features.EstimatedSalary,
-                features.Geography_Germany, features.Geography_Spain
-            ]])
-            
-            proba = model.predict_proba(input_data)[0, 1]
-            prediction = int(proba > 0.5)
-            
-            predictions.append({
-                "churn_probability": round(float(proba), 4),
-                "prediction": prediction
-            })
+        predictions = [
+            {"churn_probability": round(float(proba), 4), "prediction": int(proba > 0.5)}
+            for proba in probas
+        ]
         
         logger.info(f"Batch prediction : {len(predictions)} clients traites")
         
@@ -186,6 +275,105 @@ def predict_batch(features_list: List[CustomerFeatures]):
         logger.error(f"Erreur batch prediction : {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def require_feature_store():
+    if model is None:
+        raise HTTPException(status_code=503, detail="Modele non disponible")
+    if feature_store is None:
+        raise HTTPException(status_code=503, detail="Feature store non disponible")
+
+@app.get("/customers/{customer_id}/predict", response_model=PredictionResponse, tags=["Prediction"])
+def predict_customer(customer_id: int):
+    """Prediction pour un client connu du feature store"""
+    require_feature_store()
+    input_data, found = feature_store.gather([customer_id])
+    if not found[0]:
+        raise HTTPException(status_code=404, detail=f"Client {customer_id} inconnu")
+    
+    proba = predictor.predict_proba(model, input_data)[0, 1]
+    prediction_stats["total_predictions"] += 1
+    prediction_stats["last_prediction"] = datetime.now().isoformat()
+    return format_prediction(proba)
+
+@app.post("/predict/customers", tags=["Prediction"])
+def predict_customers(request: CustomerIdsRequest):
+    """
+    Predictions en batch a partir des identifiants clients : les features
+    sont lues dans le feature store directement dans la matrice du modele
+    """
+    require_feature_store()
+    if len(request.customer_ids) > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch trop volumineux : {len(request.customer_ids)} clients (max {MAX_BATCH_ROWS})"
+        )
+    
+    input_data, found = feature_store.gather(request.customer_ids)
+    ids = np.asarray(request.customer_ids, dtype=np.int64)
+    probas = predictor.predict_proba(model, input_data[found])[:, 1] if found.any() else np.empty(0)
+    
+    predictions = [
+        {"customer_id": int(customer_id), **format_prediction(proba)}
+        for customer_id, proba in zip(ids[found], probas)
+    ]
+    
+    prediction_stats["total_batch_predictions"] += len(predictions)
+    prediction_stats["last_prediction"] = datetime.now().isoformat()
+    return {
+        "predictions": predictions,
+        "count": len(predictions),
+        "not_found": [int(customer_id) for customer_id in ids[~found]]
+    }
+
+def verify_admin(x_admin_token: Optional[str] = Header(None)):
+    """Verifie le jeton d'administration (en-tete X-Admin-Token)"""
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Acces administrateur requis")
+
+@app.post("/admin/profile", tags=["Admin"], dependencies=[Depends(verify_admin)])
+async def profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    format: str = Query("json", pattern="^(json|collapsed)$")
+):
+    """
+    Profile le processus par echantillonnage de piles pendant `seconds`.
+    Retourne les piles agregees (format flamegraph) et la repartition du temps.
+    """
+    global active_profiler
+    if active_profiler is not None:
+        raise HTTPException(status_code=409, detail="Un profilage est deja en cours")
+
+    # L'attente se fait dans la boucle asyncio : aucun thread du pool n'est occupe
+    active_profiler = profiler = SamplingProfiler()
+    try:
+        profiler.start(seconds)
+        while profiler.is_running():
+            await asyncio.sleep(0.1)
+        profiler.stop()
+    finally:
+        active_profiler = None
+
+    logger.info(f"Profilage termine : {profiler.samples} echantillons")
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return {"summary": profiler.summary(), "collapsed": profiler.collapsed()}
+
+@app.post("/admin/customers/upsert", tags=["Admin"], dependencies=[Depends(verify_admin)])
+def upsert_customers(records: List[CustomerRecord]):
+    """Mise a jour incrementale du feature store (clients modifies ou nouveaux)"""
+    if feature_store is None:
+        raise HTTPException(status_code=503, detail="Feature store non disponible")
+    
+    df = pd.DataFrame([record.model_dump() for record in records])
+    if df.empty:
+        return {"updated": 0, "inserted": 0}
+    try:
+        result = feature_store.upsert(df, id_column="customer_id")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    logger.info(f"Feature store : {result['updated']} clients mis a jour, {result['inserted']} ajoutes")
+    return result
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
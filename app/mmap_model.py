@@ -0,0 +1,188 @@
+"""
+Format de modele memory-mappable pour les forets d'arbres.
+
+Les tableaux des arbres (enfants, features, seuils, valeurs des feuilles)
+sont concatenes et ecrits non compresses en .npy dans un repertoire
+<modele>.mmap/. Ils sont ouverts en lecture seule avec np.load(mmap_mode="r") :
+tous les workers d'une machine partagent les memes pages via le cache du
+systeme, et le chargement ne deserialise rien.
+
+    python -m app.mmap_model model/churn_model.pkl   # ecrit model/churn_model.mmap/
+"""
+import os
+import sys
+import json
+
+import joblib
+import numpy as np
+
+from app.cache import model_version
+
+FORMAT_VERSION = 2
+ARRAYS = ["roots", "children", "feature", "threshold", "value", "missing_go_to_left"]
+PREDICT_CHUNK_ROWS = 1000
+
+
+def packed_path(model_path):
+    """Repertoire du format mmap associe a un fichier pickle"""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.mmap"
+
+
+def _trees(model):
+    if hasattr(model, "estimators_") and hasattr(model, "n_outputs_"):
+        return [est.tree_ for est in model.estimators_]
+    if hasattr(model, "tree_"):
+        return [model.tree_]
+    return None
+
+
+def can_pack(model):
+    """Seules les forets / arbres de classification a une sortie sont supportes"""
+    return _trees(model) is not None and getattr(model, "n_outputs_", 1) == 1 \
+        and hasattr(model, "classes_")
+
+
+def pack_forest(model, directory, source_version=None):
+    """Ecrit les arbres du modele dans `directory` (ecriture atomique)"""
+    if not can_pack(model):
+        raise ValueError(f"Modele non supporte pour le format mmap : {type(model).__name__}")
+
+    trees = _trees(model)
+    offsets = np.cumsum([0] + [t.node_count for t in trees])
+    left, right, feature, threshold, value, missing_left = [], [], [], [], [], []
+    for offset, tree in zip(offsets, trees):
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        # Les feuilles pointent sur elles-memes : le parcours peut faire
+        # max_depth iterations sans test de fin
+        left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        # Branche des valeurs manquantes apprise (ou majoritaire) par scikit-learn
+        missing_left.append(getattr(tree, "missing_go_to_left", np.ones(tree.node_count)))
+        counts = tree.value[:, 0, :]
+        value.append(counts / counts.sum(axis=1, keepdims=True))
+
+    arrays = {
+        "roots": offsets[:-1].astype(np.int32),
+        # Enfants entrelaces : children[2 * noeud + aller_a_droite]
+        "children": np.stack([np.concatenate(left), np.concatenate(right)], axis=1).ravel().astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+        "missing_go_to_left": np.concatenate(missing_left).astype(bool),
+    }
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "model_type": type(model).__name__,
+        "n_trees": len(trees),
+        "max_depth": int(max(t.max_depth for t in trees)),
+        "n_features": int(model.n_features_in_),
+        "classes": model.classes_.tolist(),
+        "source_version": source_version,
+    }
+
+    tmp = f"{directory}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), array)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    if os.path.isdir(directory):
+        old = f"{directory}.{os.getpid()}.old"
+        os.replace(directory, old)
+        os.replace(tmp, directory)
+        for name in os.listdir(old):
+            os.remove(os.path.join(old, name))
+        os.rmdir(old)
+    else:
+        os.replace(tmp, directory)
+
+
+class MmapForest:
+    """
+    Foret chargee en memory-map, avec la meme interface predict_proba que
+    scikit-learn. Toutes les lignes descendent tous les arbres en meme temps :
+    max_depth etapes vectorisees par bloc de PREDICT_CHUNK_ROWS lignes.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Version de format inconnue : {self.meta['format_version']}")
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+        self.classes_ = np.array(self.meta["classes"])
+        self.n_features_in_ = self.meta["n_features"]
+        self.max_depth = self.meta["max_depth"]
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X doit avoir {self.n_features_in_} colonnes")
+        return np.concatenate([
+            self._predict_chunk(X[start:start + PREDICT_CHUNK_ROWS])
+            for start in range(0, len(X), PREDICT_CHUNK_ROWS)
+        ]) if len(X) else np.empty((0, len(self.classes_)))
+
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        row_offsets = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        flat_X = X.ravel()
+        has_nan = bool(np.isnan(flat_X).any())
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            # Comparaison float32 <= float64 comme dans scikit-learn
+            values = np.take(flat_X, row_offsets + np.take(self.feature, node))
+            go_right = ~(values <= np.take(self.threshold, node))
+            if has_nan:
+                # NaN : meme branche que scikit-learn (missing_go_to_left)
+                missing = np.isnan(values)
+                go_right[missing] = ~np.take(self.missing_go_to_left, node[missing])
+            node = np.take(self.children, 2 * node + go_right)
+        return np.take(self.value, node, axis=0).mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def resolve_model_path(model_path):
+    """
+    Chemin a charger : le repertoire mmap associe au pickle s'il existe et
+    correspond au meme modele dans la version de format courante, sinon le
+    pickle lui-meme.
+    """
+    if os.path.isdir(model_path):
+        return model_path
+    directory = packed_path(model_path)
+    meta_path = os.path.join(directory, "meta.json")
+    if os.path.exists(meta_path) and os.path.exists(model_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("format_version") == FORMAT_VERSION \
+                and meta.get("source_version") == model_version(model_path):
+            return directory
+    return model_path
+
+
+def save_model(model, model_path):
+    """Ecrit le pickle et, si le modele le permet, le format mmap associe"""
+    joblib.dump(model, model_path)
+    if can_pack(model):
+        pack_forest(model, packed_path(model_path), model_version(model_path))
+
+
+def load_model(model_path):
+    """Charge un modele : memory-map pour un repertoire mmap, joblib sinon"""
+    if os.path.isdir(model_path):
+        return MmapForest(model_path)
+    return joblib.load(model_path)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "model/churn_model.pkl"
+    pack_forest(joblib.load(source), packed_path(source), model_version(source))
+    print(f"✅ Modele mmap ecrit dans {packed_path(source)}")
@@ -31,6 +31,14 @@ class CustomerFeatures(BaseModel):
         }
     }
 
+class CustomerRecord(CustomerFeatures):
+    """Features d'un client identifie, pour la mise a jour du feature store"""
+    customer_id: int = Field(..., description="Identifiant client")
+
+class CustomerIdsRequest(BaseModel):
+    """Identifiants des clients a scorer depuis le feature store"""
+    customer_ids: List[int] = Field(..., description="Identifiants clients")
+
 class PredictionResponse(BaseModel):
     """Schema pour la reponse de prediction"""
     churn_probability: float = Field(..., description="Probabilite de churn (0-1)")
@@ -40,4 +48,7 @@ class PredictionResponse(BaseModel):
 class HealthResponse(BaseModel):
     """Schema pour le health check"""
     status: str
-    model_loaded: bool
\ No newline at end of file
+    model_loaded: bool
+
+# Ordre des colonnes attendu par le modele
+FEATURE_COLUMNS = list(CustomerFeatures.model_fields)
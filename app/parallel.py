@@ -0,0 +1,137 @@
+import os
+import math
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+logger = logging.getLogger(__name__)
+
+
+
+def workers_from_cmdline(argv):
+    """Nombre de workers d'une ligne de commande uvicorn / gunicorn (--workers N, -w N)"""
+    if not any("uvicorn" in arg or "gunicorn" in arg for arg in argv[:3]):
+        return None
+    for i, arg in enumerate(argv):
+        value = None
+        if arg in ("--workers", "-w") and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+        if value is not None and value.isdigit():
+            return int(value)
+    return None
+
+
+def detect_web_concurrency():
+    """
+    Nombre de workers sur la machine et origine de la valeur. uvicorn lit
+    WEB_CONCURRENCY comme valeur par defaut de --workers mais ne la definit
+    pas : sans elle, la ligne de commande du processus superviseur est lue.
+    """
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"]), "env"
+    try:
+        with open(f"/proc/{os.getppid()}/cmdline", "rb") as f:
+            argv = f.read().decode(errors="replace").split("\0")
+    except OSError:
+        return 1, "default"
+    workers = workers_from_cmdline(argv)
+    if workers:
+        return workers, "detected"
+    return 1, "default"
+
+
+# Nombre de workers uvicorn sur la machine
+WEB_CONCURRENCY, WEB_CONCURRENCY_SOURCE = detect_web_concurrency()
+# Budget de threads d'inference par worker : les coeurs sont partages
+# entre les workers pour eviter la sursouscription
+INFERENCE_THREADS = int(os.getenv(
+    "INFERENCE_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, WEB_CONCURRENCY)))
+))
+# En dessous de ce nombre de lignes la prediction reste sequentielle
+PARALLEL_MIN_ROWS = int(os.getenv("PARALLEL_MIN_ROWS", "2000"))
+
+
+class ParallelPredictor:
+    """
+    Controle le parallelisme intra-requete de predict_proba.
+
+    Les petites entrees sont evaluees directement dans le thread appelant.
+    Les grandes matrices sont decoupees en blocs executes par un pool de
+    threads unique pour tout le processus : le budget INFERENCE_THREADS
+    est partage par toutes les requetes en cours (le code Cython des
+    arbres relache le GIL).
+    """
+
+    def __init__(self, threads=INFERENCE_THREADS, min_rows=PARALLEL_MIN_ROWS):
+        self.threads = max(1, threads)
+        self.min_rows = min_rows
+        self._executor = None
+        self._lock = threading.Lock()
+        self.serial_calls = 0
+        self.parallel_calls = 0
+
+    def configure(self, model):
+        """
+        Force l'evaluation sequentielle a l'interieur du modele et limite
+        les threads BLAS/OpenMP : seul ce controleur parallelise.
+        """
+        if WEB_CONCURRENCY_SOURCE == "detected":
+            logger.warning(
+                f"WEB_CONCURRENCY non defini : {WEB_CONCURRENCY} workers detectes "
+                f"sur la ligne de commande du superviseur"
+            )
+        elif WEB_CONCURRENCY_SOURCE == "default":
+            logger.warning(
+                "WEB_CONCURRENCY non defini : 1 worker suppose, definir WEB_CONCURRENCY "
+                "si plusieurs workers se partagent la machine"
+            )
+        threadpool_limits(limits=1)
+        estimators = [model] + [step for _, step in getattr(model, "steps", [])]
+        for estimator in estimators:
+            if hasattr(estimator, "n_jobs"):
+                estimator.n_jobs = 1
+        logger.info(
+            f"Parallelisme d'inference : {self.threads} threads par worker "
+            f"({WEB_CONCURRENCY} workers), seuil {self.min_rows} lignes"
+        )
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.threads, thread_name_prefix="inference"
+                )
+            return self._executor
+
+    def predict_proba(self, model, X):
+        n_chunks = min(self.threads, math.ceil(len(X) / self.min_rows)) if len(X) else 1
+        if n_chunks <= 1:
+            self.serial_calls += 1
+            return model.predict_proba(X)
+
+        self.parallel_calls += 1
+        chunks = np.array_split(X, n_chunks)
+        executor = self._get_executor()
+        return np.concatenate(list(executor.map(model.predict_proba, chunks)))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "inference_threads": self.threads,
+            "web_concurrency": WEB_CONCURRENCY,
+            "web_concurrency_source": WEB_CONCURRENCY_SOURCE,
+            "cpu_count": os.cpu_count(),
+            "parallel_min_rows": self.min_rows,
+            "serial_calls": self.serial_calls,
+            "parallel_calls": self.parallel_calls,
+        }
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Part maximale d'un coeur consommee par l'echantillonnage
+PROFILE_MAX_OVERHEAD = float(os.getenv("PROFILE_MAX_OVERHEAD", "0.02"))
+MAX_STACK_DEPTH = 64
+
+# Categories du resume : la frame d'interet la plus proche de la feuille
+# (code de l'application ou fonction de librairie ciblee) determine la
+# categorie de l'echantillon. Les frames intermediaires (json, socket,
+# transport) ne sont pas des frames d'interet : elles prennent la categorie
+# de leur appelant, ou "other" si aucun appelant n'est cible.
+CATEGORIES = [
+    ("predict_proba", ("sklearn/", ":predict_proba", "app/mmap_model.py:")),
+    ("caching", ("app/cache.py:", "app/main.py:hash_features", "app/main.py:predict_cached", "sqlite3/")),
+    ("validation", ("pydantic/", ":request_body_to_args", ":_validate_value", "app/models.py:")),
+    # Rendu / encodage de la reponse seulement, pas l'envoi sur la socket
+    ("serialization", ("starlette/responses.py:render", "fastapi/encoders.py:jsonable_encoder",
+                       ":serialize_response")),
+]
+IDLE_FUNCTIONS = {"wait", "select", "poll", "sleep", "get", "_worker", "run_forever", "_run_once", "accept"}
+IDLE_MODULES = ("threading.py:", "selectors.py:", "queue.py:", "asyncio/", "concurrent/futures/")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename.replace("\\", "/")
+    parts = filename.rsplit("/", 3)
+    return f"{'/'.join(parts[-3:])}:{code.co_name}"
+
+
+def _classify(labels):
+    """Categorie d'un echantillon a partir de sa pile (racine -> feuille)"""
+    if labels and labels[-1].rsplit(":", 1)[-1] in IDLE_FUNCTIONS \
+            and any(m in labels[-1] for m in IDLE_MODULES):
+        return "idle"
+    for label in reversed(labels):
+        for category, patterns in CATEGORIES:
+            if any(p in label for p in patterns):
+                return category
+    return "other"
+
+
+class SamplingProfiler:
+    """
+    Profiler par echantillonnage des piles de tous les threads du processus.
+
+    Un thread dedie lit sys._current_frames() a intervalle regulier. Le
+    temps passe a echantillonner est mesure et l'intervalle est allonge
+    si necessaire pour ne jamais depasser max_overhead d'un coeur.
+    """
+
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS, max_overhead=PROFILE_MAX_OVERHEAD):
+        self.interval = interval_ms / 1000
+        self.max_overhead = max_overhead
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, seconds):
+        self._thread = threading.Thread(
+            target=self._run, args=(min(seconds, PROFILE_MAX_SECONDS),),
+            name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, seconds):
+        own_id = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + seconds
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            self._sample(own_id)
+            cost = time.perf_counter() - t0
+            self.sampling_seconds += cost
+            self._stop.wait(max(self.interval, cost / self.max_overhead - cost))
+        self.elapsed = time.perf_counter() - start
+
+    def _sample(self, own_id):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.reverse()
+            self.stacks[";".join(labels)] += 1
+            self.categories[_classify(labels)] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """Piles agregees au format 'frame1;frame2;... count' (flamegraph.pl)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        busy = {k: v for k, v in self.categories.items() if k != "idle"}
+        total = sum(busy.values())
+        return {
+            "duration_seconds": round(self.elapsed, 3),
+            "samples": self.samples,
+            "overhead_pct": round(100 * self.sampling_seconds / self.elapsed, 3) if self.elapsed else 0.0,
+            "idle_stack_samples": self.categories.get("idle", 0),
+            "time_split_pct": {
+                category: round(100 * busy.get(category, 0) / total, 2) if total else 0.0
+                for category in [c for c, _ in CATEGORIES] + ["other"]
+            },
+        }
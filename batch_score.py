@@ -0,0 +1,216 @@
+"""
+Scoring batch incremental des clients.
+
+Chaque ligne scoree est memorisee avec une empreinte de ses 10 features.
+Au passage suivant seules les lignes nouvelles ou modifiees sont
+re-scorees (toutes si la version du modele a change), puis fusionnees
+dans la table de scores persistee. Le top-K des clients a risque est
+extrait par selection partielle (argpartition) sans trier toute la table.
+"""
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.models import FEATURE_COLUMNS
+from app.cache import model_version
+from app.mmap_model import load_model, resolve_model_path
+
+SCORE_CHUNK_ROWS = 500_000
+# Au-dela de ce nombre de lignes en entree, le pickle scikit-learn est
+# utilise : son debit en bulk est ~2x celui du format mmap, dont le
+# chargement instantane ne compte plus sur un gros volume
+MMAP_MAX_ROWS = 100_000
+
+
+def fingerprint_rows(df: pd.DataFrame) -> np.ndarray:
+    """Empreinte 64 bits vectorisee des features de chaque ligne"""
+    return pd.util.hash_pandas_object(df[FEATURE_COLUMNS], index=False).to_numpy()
+
+
+TABLE_FILE = "table.npz"
+TABLE_ARRAYS = ("ids", "fingerprints", "scores")
+
+
+def load_score_table(table_dir):
+    """
+    Charge la table (ids tries, empreintes, scores) et ses metadonnees.
+    Leve ValueError si les tableaux ne correspondent pas aux metadonnees.
+    """
+    path = os.path.join(table_dir, TABLE_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        arrays = {name: data[name] for name in TABLE_ARRAYS}
+    for name, array in arrays.items():
+        if len(array) != meta["n_rows"]:
+            raise ValueError(
+                f"Table de scores incoherente : {name} a {len(array)} lignes, "
+                f"{meta['n_rows']} attendues (generation {meta['generation']})"
+            )
+    return meta, arrays
+
+
+def save_score_table(table_dir, ids, fingerprints, scores, version, generation=1):
+    """
+    Ecrit tableaux et metadonnees dans un seul fichier publie par un
+    renommage atomique : un arret brutal laisse l'ancienne table intacte.
+    """
+    os.makedirs(table_dir, exist_ok=True)
+    meta = {
+        "model_version": version,
+        "n_rows": int(len(ids)),
+        "generation": generation,
+        "updated_at": datetime.now().isoformat()
+    }
+    tmp_path = os.path.join(table_dir, f"{TABLE_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, ids=ids, fingerprints=fingerprints, scores=scores, meta=np.array(json.dumps(meta)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(table_dir, TABLE_FILE))
+
+
+def predict_in_chunks(model, X, chunk_rows=SCORE_CHUNK_ROWS):
+    scores = np.empty(len(X), dtype=np.float32)
+    for start in range(0, len(X), chunk_rows):
+        scores[start:start + chunk_rows] = model.predict_proba(X[start:start + chunk_rows])[:, 1]
+    return scores
+
+
+def top_k(ids, scores, k):
+    """Top-K par probabilite de churn : selection partielle puis tri des K"""
+    k = min(k, len(scores))
+    if k == 0:
+        return ids[:0], scores[:0]
+    part = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    order = part[np.argsort(scores[part])[::-1]]
+    return ids[order], scores[order]
+
+
+def score_incremental(df, table_dir, model, version, id_column="CustomerId", k=5000,
+                      row_ids=False):
+    """
+    Re-score les lignes nouvelles ou modifiees de df et met a jour la table.
+    Les clients absents de df sont conserves tant que le modele ne change pas.
+    Sans colonne id_column, leve ValueError sauf si row_ids=True (le numero
+    de ligne sert alors d'identifiant : a reserver aux fichiers dont l'ordre
+    des lignes ne change jamais).
+    Retourne (ids du top-K, scores du top-K, statistiques).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+
+    if id_column in df.columns:
+        ids = df[id_column].to_numpy(dtype=np.int64)
+    elif row_ids:
+        ids = np.arange(len(df), dtype=np.int64)
+    else:
+        raise ValueError(
+            f"Colonne d'identifiant {id_column!r} absente : une ligne ajoutee ou supprimee "
+            f"decalerait tous les clients suivants (--row-ids pour utiliser les numeros de ligne)"
+        )
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    fingerprints = fingerprint_rows(df)[order]
+    timings["fingerprint_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    previous = load_score_table(table_dir)
+    scores = np.empty(len(ids), dtype=np.float32)
+    changed = np.ones(len(ids), dtype=bool)
+    kept_ids = np.empty(0, dtype=np.int64)
+    if previous is not None and previous[0]["model_version"] == version and previous[0]["n_rows"]:
+        old = previous[1]
+        pos = np.searchsorted(old["ids"], ids)
+        pos_clipped = np.minimum(pos, max(len(old["ids"]) - 1, 0))
+        found = (pos < len(old["ids"])) & (old["ids"][pos_clipped] == ids)
+        unchanged = found & (old["fingerprints"][pos_clipped] == fingerprints)
+        scores[unchanged] = old["scores"][pos_clipped[unchanged]]
+        changed = ~unchanged
+
+        # Clients de l'ancienne table absents de l'entree
+        missing = np.ones(len(old["ids"]), dtype=bool)
+        missing[pos_clipped[found]] = False
+        kept_ids = old["ids"][missing]
+        kept_fingerprints = old["fingerprints"][missing]
+        kept_scores = old["scores"][missing]
+    timings["diff_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    n_changed = int(changed.sum())
+    if n_changed:
+        # Seules les lignes modifiees sont copiees dans la matrice d'entree
+        X = df.iloc[order[changed], df.columns.get_indexer(FEATURE_COLUMNS)].to_numpy(dtype=np.float64)
+        scores[changed] = predict_in_chunks(model, X)
+    timings["score_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if len(kept_ids):
+        ids = np.concatenate([ids, kept_ids])
+        fingerprints = np.concatenate([fingerprints, kept_fingerprints])
+        scores = np.concatenate([scores, kept_scores])
+        merge_order = np.argsort(ids, kind="stable")
+        ids, fingerprints, scores = ids[merge_order], fingerprints[merge_order], scores[merge_order]
+    generation = previous[0]["generation"] + 1 if previous is not None else 1
+    save_score_table(table_dir, ids, fingerprints, scores, version, generation)
+    timings["merge_save_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    top_ids, top_scores = top_k(ids, scores, k)
+    timings["top_k_s"] = time.perf_counter() - t0
+
+    stats = {
+        "rows_in": int(len(df)),
+        "rows_rescored": n_changed,
+        "rows_in_table": int(len(ids)),
+        "timings": {name: round(value, 3) for name, value in timings.items()},
+    }
+    return top_ids, top_scores, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring incremental et top-K des clients a risque")
+    parser.add_argument("input", help="CSV des features clients")
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "model/churn_model.pkl"))
+    parser.add_argument("--table-dir", default="scores")
+    parser.add_argument("--id-column", default="CustomerId")
+    parser.add_argument("--top-k", type=int, default=5000)
+    parser.add_argument("--output", default="scores/top_k.csv")
+    parser.add_argument("--row-ids", action="store_true",
+                        help="Sans colonne d'identifiant, utiliser le numero de ligne comme identifiant")
+    parser.add_argument("--no-mmap", action="store_true",
+                        help="Toujours charger le pickle scikit-learn (format mmap ignore)")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input)
+    if args.no_mmap or len(df) > MMAP_MAX_ROWS:
+        model_file = args.model
+    else:
+        model_file = resolve_model_path(args.model)
+    model = load_model(model_file)
+    top_ids, top_scores, stats = score_incremental(
+        df, args.table_dir, model, model_version(model_file), args.id_column, args.top_k,
+        row_ids=args.row_ids
+    )
+
+    # Numeros de ligne (--row-ids) : pas presentes comme des identifiants clients
+    id_header = args.id_column if args.id_column in df.columns else "row_number"
+    pd.DataFrame({
+        id_header: top_ids,
+        "churn_probability": np.round(top_scores, 4)
+    }).to_csv(args.output, index=False)
+
+    print(f"✅ {stats['rows_rescored']}/{stats['rows_in']} lignes re-scorees, "
+          f"{stats['rows_in_table']} clients dans la table")
+    print(f"⏱️  {stats['timings']}")
+    print(f"📁 Top-{args.top_k} : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark de la compression du transport (app/compression.py).
+
+Mesure, contre une API demarree, la latence de bout en bout de
+/predict/batch et les octets envoyes / recus par encodage, en incluant
+la compression cote client et la decompression de la reponse.
+
+    MAX_BATCH_ROWS=100000 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_compression.py --url http://localhost:8000 --sizes 1000 100000
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import FEATURE_COLUMNS
+from app.compression import COMPRESS_LEVEL
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def encode(payload, encoding):
+    if encoding == "gzip":
+        return gzip.compress(payload, compresslevel=COMPRESS_LEVEL)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compress(payload)
+    return payload
+
+
+def call(url, rows, encoding):
+    """Latence (compression + requete + decodage de la reponse) et octets sur le reseau"""
+    start = time.perf_counter()
+    body = encode(json.dumps(rows).encode("utf-8"), encoding)
+    headers = {"Content-Type": "application/json"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+        headers["Accept-Encoding"] = "gzip"
+    else:
+        headers["Accept-Encoding"] = "identity"
+
+    response = requests.post(f"{url}/predict/batch", data=body, headers=headers, stream=True, timeout=300)
+    raw = response.raw.read(decode_content=False)
+    response.raise_for_status()
+    content = gzip.decompress(raw) if response.headers.get("content-encoding") == "gzip" else raw
+    count = json.loads(content)["count"]
+    elapsed = time.perf_counter() - start
+    assert count == len(rows)
+    return elapsed, len(body), len(raw)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    encodings = ["identity", "gzip"] + (["zstd"] if zstandard is not None else [])
+    ref = pd.read_csv("data/bank_churn.csv")[FEATURE_COLUMNS]
+    rng = np.random.default_rng(0)
+
+    print(f"{'lignes':>8} {'encodage':>9} {'latence (s)':>12} {'requete (Ko)':>13} {'reponse (Ko)':>13}")
+    for size in args.sizes:
+        rows = ref.iloc[rng.integers(0, len(ref), size)].to_dict(orient="records")
+        for encoding in encodings:
+            call(args.url, rows[:10], encoding)  # echauffement
+            results = [call(args.url, rows, encoding) for _ in range(args.repeat)]
+            latency = min(r[0] for r in results)
+            _, sent, received = results[0]
+            print(f"{size:>8} {encoding:>9} {latency:>12.3f} {sent / 1024:>13.1f} {received / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark du scoring incremental (batch_score.py).
+
+Construit une base de N clients par reechantillonnage de data/bank_churn.csv,
+fait un premier scoring complet puis mesure un passage avec 1%, 10% et 100%
+de lignes modifiees. Compare aussi argpartition au tri complet pour le top-K.
+
+    python benchmarks/bench_incremental.py --rows 50000000 --model model/churn_model.pkl
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch_score import score_incremental, top_k
+
+
+def build_base(n_rows, seed=42):
+    ref = pd.read_csv("data/bank_churn.csv").drop(columns=["Exited"])
+    rng = np.random.default_rng(seed)
+    df = ref.iloc[rng.integers(0, len(ref), n_rows)].reset_index(drop=True)
+    df.insert(0, "CustomerId", np.arange(n_rows, dtype=np.int64))
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--model", default="model/churn_model.pkl")
+    parser.add_argument("--top-k", type=int, default=5000)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    df = build_base(args.rows)
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as table_dir:
+        _, _, stats = score_incremental(df, table_dir, model, "bench", k=args.top_k)
+        print(f"scoring initial : {stats['timings']}")
+
+        for rate in (0.01, 0.10, 1.0):
+            changed = rng.random(len(df)) < rate
+            df.loc[changed, "Balance"] += 1.0
+            start = time.perf_counter()
+            _, _, stats = score_incremental(df, table_dir, model, "bench", k=args.top_k)
+            total = time.perf_counter() - start
+            print(f"{rate:>5.0%} modifie : {stats['rows_rescored']:>10} lignes re-scorees, "
+                  f"total {total:.2f}s {stats['timings']}")
+
+    scores = rng.random(len(df)).astype(np.float32)
+    ids = df["CustomerId"].to_numpy()
+    start = time.perf_counter()
+    top_k(ids, scores, args.top_k)
+    partial = time.perf_counter() - start
+    start = time.perf_counter()
+    np.argsort(scores)[::-1][:args.top_k]
+    full = time.perf_counter() - start
+    print(f"top-{args.top_k} : argpartition {partial:.3f}s vs tri complet {full:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark memoire et temps de chargement : pickle joblib vs format mmap.
+
+Lance N processus qui chargent le modele dans le format demande, predisent
+un batch (pour toucher toutes les pages des arbres) puis restent vivants
+ensemble pendant la mesure. Le RSS compte les pages partagees dans chaque
+processus ; le PSS les repartit entre les processus qui les partagent.
+
+    python -m app.mmap_model model/churn_model.pkl
+    python benchmarks/bench_model_load.py --model model/churn_model.pkl --workers 4
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def memory_kb():
+    """RSS et PSS du processus courant (Linux)"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def worker(model_path, X, ready, release, results):
+    from app.mmap_model import load_model
+    baseline = memory_kb()
+    start = time.perf_counter()
+    model = load_model(model_path)
+    load_seconds = time.perf_counter() - start
+    model.predict_proba(X)
+    ready.wait()
+    after = memory_kb()
+    results.put({
+        "load_ms": 1000 * load_seconds,
+        "rss_mb": after["Rss"] / 1024,
+        "pss_mb": after["Pss"] / 1024,
+        "model_rss_mb": (after["Rss"] - baseline["Rss"]) / 1024,
+        "model_pss_mb": (after["Pss"] - baseline["Pss"]) / 1024,
+    })
+    release.wait()
+
+
+def run(model_path, workers, X):
+    ctx = mp.get_context("spawn")
+    ready = ctx.Barrier(workers + 1)
+    release = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(model_path, X, ready, release, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    measures = [results.get() for _ in procs]
+    release.wait()
+    for p in procs:
+        p.join()
+    return {key: float(np.mean([m[key] for m in measures])) for key in measures[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="model/churn_model.pkl")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    from app.mmap_model import packed_path
+    from app.models import FEATURE_COLUMNS
+    X = pd.read_csv("data/bank_churn.csv")[FEATURE_COLUMNS].to_numpy(dtype=np.float64)[:1000]
+
+    print(f"{args.workers} workers, moyennes par worker")
+    print(f"{'format':<8} {'chargement':>12} {'RSS':>10} {'PSS':>10} {'RSS modele':>12} {'PSS modele':>12}")
+    for label, path in (("pickle", args.model), ("mmap", packed_path(args.model))):
+        m = run(path, args.workers, X)
+        print(f"{label:<8} {m['load_ms']:>10.1f}ms {m['rss_mb']:>8.1f}MB {m['pss_mb']:>8.1f}MB "
+              f"{m['model_rss_mb']:>10.1f}MB {m['model_pss_mb']:>10.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
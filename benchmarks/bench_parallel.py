@@ -0,0 +1,118 @@
+"""
+Benchmark du parallelisme d'inference (app/parallel.py).
+
+Mesure le debit de predict_proba par taille de batch et par budget de
+threads, et compare au n_jobs d'origine du modele. Avec --workers, mesure
+aussi le debit cumule de N processus (comme N workers uvicorn) qui se
+partagent les coeurs comme INFERENCE_THREADS (cpu_count // N threads chacun).
+
+    python benchmarks/bench_parallel.py --model model/churn_model.pkl --threads 1 2 4 8
+    python benchmarks/bench_parallel.py --workers 1 2 4 --sizes 1000 100000
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+import joblib
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import FEATURE_COLUMNS
+from app.parallel import ParallelPredictor, PARALLEL_MIN_ROWS
+
+
+def throughput(predict, X, min_seconds=1.0):
+    """Lignes par seconde sur des appels repetes pendant au moins min_seconds"""
+    predict(X)  # echauffement
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        predict(X)
+        calls += 1
+    return calls * len(X) / (time.perf_counter() - start)
+
+
+def worker_throughput(model_path, X, threads, barrier, results):
+    """Un processus = un worker uvicorn avec son budget de threads"""
+    model = joblib.load(model_path)
+    predictor = ParallelPredictor(threads=threads)
+    predictor.configure(model)
+    predictor.predict_proba(model, X)  # echauffement
+    barrier.wait()
+    results.put(throughput(lambda A: predictor.predict_proba(model, A), X))
+    predictor.shutdown()
+
+
+def multi_worker_throughput(model_path, X, workers):
+    """Debit cumule de `workers` processus demarres en meme temps"""
+    ctx = multiprocessing.get_context("spawn")
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    processes = [
+        ctx.Process(target=worker_throughput, args=(model_path, X, threads, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="model/churn_model.pkl")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000, 10000, 100000])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Nombres de processus workers a comparer (debit cumule)")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    original_n_jobs = getattr(model, "n_jobs", None)
+    threads_list = sorted(set(args.threads))
+    ref = pd.read_csv("data/bank_churn.csv")[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(0)
+
+    print(f"cpu_count={os.cpu_count()}  seuil parallele={PARALLEL_MIN_ROWS} lignes")
+    header = f"{'lignes':>8} {'origine':>12}" + "".join(f" {f'{t} threads':>12}" for t in threads_list)
+    print(header)
+    for size in args.sizes:
+        X = ref[rng.integers(0, len(ref), size)]
+        if hasattr(model, "n_jobs"):
+            model.n_jobs = original_n_jobs
+        row = [f"{size:>8}", f"{throughput(model.predict_proba, X):>12.0f}"]
+        for threads in threads_list:
+            # configure() limite les threads BLAS/OpenMP du processus :
+            # limites d'origine restaurees avant la mesure suivante
+            with threadpool_limits(limits=None):
+                predictor = ParallelPredictor(threads=threads)
+                predictor.configure(model)
+                row.append(f"{throughput(lambda A: predictor.predict_proba(model, A), X):>12.0f}")
+                predictor.shutdown()
+            if hasattr(model, "n_jobs"):
+                model.n_jobs = original_n_jobs
+        print(" ".join(row))
+    print("(lignes/s ; 'origine' = predict_proba avec le n_jobs du modele charge)")
+
+    if args.workers:
+        workers_list = sorted(set(args.workers))
+        print(f"\n{'lignes':>8}" + "".join(
+            f" {f'{w}x{max(1, (os.cpu_count() or 1) // w)} thr':>12}" for w in workers_list
+        ))
+        for size in args.sizes:
+            X = ref[rng.integers(0, len(ref), size)]
+            row = [f"{size:>8}"]
+            for workers in workers_list:
+                row.append(f"{multi_worker_throughput(args.model, X, workers):>12.0f}")
+            print(" ".join(row))
+        print("(lignes/s cumulees ; 'N x T thr' = N processus de T threads d'inference)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ Interface utilisateur pour tester l'API de prédiction de churn bancaire
 import streamlit as st
 import requests
 import json
+import gzip
 import pandas as pd
 import time
 from datetime import datetime
@@ -23,10 +24,15 @@ st.set_page_config(
 API_BASE_URL = "https://bank-churn.redflower-49f77806.francecentral.azurecontainerapps.io"
 
 # Fonctions utilitaires
-def call_api(endpoint, data=None):
-    """Appel à l'API avec gestion d'erreur"""
+def call_api(endpoint, data=None, compress=False):
+    """Appel à l'API avec gestion d'erreur (corps compressé en gzip si compress=True)"""
     try:
-        if data:
+        if data and compress:
+            # La réponse est aussi compressée (Accept-Encoding envoyé par requests)
+            body = gzip.compress(json.dumps(data).encode("utf-8"), compresslevel=5)
+            headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+            response = requests.post(f"{API_BASE_URL}{endpoint}", data=body, headers=headers, timeout=10)
+        elif data:
             response = requests.post(f"{API_BASE_URL}{endpoint}", json=data, timeout=10)
         else:
             response = requests.get(f"{API_BASE_URL}{endpoint}", timeout=10)
@@ -177,7 +183,7 @@ def batch_prediction_interface():
 
         if st.button("🚀 Lancer l'analyse par lot"):
             with st.spinner("Analyse en cours..."):
-                result = call_api("/predict/batch", st.session_state.batch_data)
+                result = call_api("/predict/batch", st.session_state.batch_data, compress=True)
 
             if result:
                 st.success(f"✅ Analyse terminée pour {result.get('count', 0)} clients")
@@ -0,0 +1,72 @@
+# tests/test_admission.py
+import sys
+import os
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.admission import AdmissionLimiter, Rejected
+
+client = TestClient(app)
+
+TEST_CUSTOMER = {
+    "CreditScore": 650, "Age": 35, "Tenure": 5, "Balance": 50000.0,
+    "NumOfProducts": 2, "HasCrCard": 1, "IsActiveMember": 1,
+    "EstimatedSalary": 75000.0, "Geography_Germany": 0, "Geography_Spain": 1
+}
+
+def test_limiter_queues_then_sheds():
+    """Une requete attend dans la file, la suivante est rejetee"""
+    async def scenario():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queued=1, queue_timeout=1)
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected):
+            await limiter.acquire()
+        limiter.release()
+        await queued
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2
+    assert stats["shed"] == 1
+    assert stats["in_flight"] == 0
+
+def test_batch_too_large_rejected():
+    """Un batch au-dela de MAX_BATCH_ROWS renvoie 413"""
+    with patch('app.main.model'), patch('app.main.MAX_BATCH_ROWS', 1):
+        response = client.post("/predict/batch", json=[TEST_CUSTOMER, TEST_CUSTOMER])
+        assert response.status_code == 413
+
+def test_predict_shed_with_retry_after():
+    """Endpoint sature : 429 avec en-tete Retry-After"""
+    with patch.dict('app.admission.limiters', {
+        "/predict": AdmissionLimiter("/predict", max_concurrent=0, max_queued=0)
+    }):
+        response = client.post("/predict", json=TEST_CUSTOMER)
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+
+def test_body_over_byte_budget_rejected():
+    """Corps au-dela de max_body_bytes : 413 avant la lecture par l'application"""
+    limiter = AdmissionLimiter("/predict/batch", max_concurrent=1, max_queued=0, max_body_bytes=100)
+    with patch('app.main.model') as mock_model, \
+            patch.dict('app.admission.limiters', {"/predict/batch": limiter}):
+        response = client.post("/predict/batch", json=[TEST_CUSTOMER] * 2)
+        assert response.status_code == 413
+
+        # Transfert chunked, sans Content-Length
+        chunks = (b'[' if i == 0 else b' ' * 50 for i in range(5))
+        response = client.post("/predict/batch", content=chunks,
+                               headers={"Content-Type": "application/json"})
+        assert response.status_code == 413
+        mock_model.predict_proba.assert_not_called()
+    assert limiter.too_large == 2
+    assert limiter.in_flight == 0
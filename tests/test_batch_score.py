@@ -0,0 +1,67 @@
+# tests/test_batch_score.py
+import sys
+import os
+
+import numpy as np
+import pytest
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import FEATURE_COLUMNS
+from batch_score import load_score_table, save_score_table, score_incremental, top_k
+
+def make_data(n=200):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(0, 2, size=(n, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    df["Balance"] = rng.random(n) * 1000
+    df.insert(0, "CustomerId", np.arange(n)[::-1])
+    model = LogisticRegression().fit(df[FEATURE_COLUMNS].to_numpy(), rng.integers(0, 2, n))
+    return df, model
+
+def test_only_changed_rows_rescored(tmp_path):
+    """Seules les lignes modifiees sont re-scorees, toutes si le modele change"""
+    df, model = make_data()
+    _, _, stats = score_incremental(df, str(tmp_path), model, "v1")
+    assert stats["rows_rescored"] == len(df)
+
+    df.loc[[3, 7], "Balance"] += 1
+    _, _, stats = score_incremental(df, str(tmp_path), model, "v1")
+    assert stats["rows_rescored"] == 2
+
+    _, _, stats = score_incremental(df, str(tmp_path), model, "v2")
+    assert stats["rows_rescored"] == len(df)
+
+def test_top_k_matches_full_sort(tmp_path):
+    """Le top-K par selection partielle correspond au tri complet"""
+    df, model = make_data()
+    top_ids, top_scores, _ = score_incremental(df, str(tmp_path), model, "v1", k=10)
+
+    expected = model.predict_proba(df[FEATURE_COLUMNS].to_numpy())[:, 1].astype(np.float32)
+    assert np.allclose(top_scores, np.sort(expected)[::-1][:10])
+    ids, scores = top_k(np.arange(5), np.array([0.1, 0.9, 0.5, 0.7, 0.2]), 2)
+    assert list(ids) == [1, 3]
+
+def test_score_table_replaced_atomically(tmp_path):
+    """Une seule publication par passage ; une table incoherente est detectee"""
+    df, model = make_data()
+    score_incremental(df, str(tmp_path), model, "v1")
+    score_incremental(df, str(tmp_path), model, "v1")
+    assert os.listdir(tmp_path) == ["table.npz"]
+    meta, arrays = load_score_table(str(tmp_path))
+    assert meta["generation"] == 2
+    assert len(arrays["scores"]) == meta["n_rows"] == len(df)
+
+    save_score_table(str(tmp_path), arrays["ids"], arrays["fingerprints"], arrays["scores"][:-1], "v1")
+    with pytest.raises(ValueError):
+        score_incremental(df, str(tmp_path), model, "v1")
+
+def test_missing_id_column_requires_opt_in(tmp_path):
+    """Sans colonne d'identifiant, les numeros de ligne ne sont utilises que sur demande"""
+    df, model = make_data()
+    df = df.drop(columns=["CustomerId"])
+    with pytest.raises(ValueError):
+        score_incremental(df, str(tmp_path), model, "v1")
+    _, _, stats = score_incremental(df, str(tmp_path), model, "v1", row_ids=True)
+    assert stats["rows_rescored"] == len(df)
@@ -0,0 +1,72 @@
+# tests/test_cache.py
+import sys
+import os
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from app.main import app, predict_cached
+from app.cache import SharedPredictionCache
+
+RESULT = {"churn_probability": 0.8, "prediction": 1, "risk_level": "High"}
+
+def test_shared_cache_keyed_on_model_version(tmp_path):
+    """Une entree n'est servie que pour la version de modele qui l'a produite"""
+    cache = SharedPredictionCache(str(tmp_path / "cache.db"), str(tmp_path / "snap.db"))
+    cache.put("v1", "abc", RESULT)
+
+    assert cache.get("v1", "abc") == RESULT
+    assert cache.get("v2", "abc") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    cache.close()
+
+def test_shared_cache_snapshot_restore(tmp_path):
+    """Le snapshot ecrit a l'arret est recharge par le processus suivant"""
+    cache = SharedPredictionCache(str(tmp_path / "cache.db"), str(tmp_path / "snap.db"))
+    cache.put("v1", "abc", RESULT)
+    cache.snapshot()
+    cache.close()
+
+    restored = SharedPredictionCache(str(tmp_path / "restart.db"), str(tmp_path / "snap.db"))
+    assert restored.get("v1", "abc") == RESULT
+    restored.close()
+
+def test_shared_cache_errors_do_not_fail_predictions(tmp_path):
+    """Base verrouillee : get renvoie None, put est ignore, l'erreur est comptee"""
+    cache = SharedPredictionCache(str(tmp_path / "cache.db"), str(tmp_path / "snap.db"))
+    conn = cache._conn
+    cache._conn = MagicMock()
+    cache._conn.execute.side_effect = sqlite3.OperationalError("database is locked")
+
+    assert cache.get("v1", "abc") is None
+    cache.put("v1", "abc", RESULT)
+    stats = cache.stats()
+    assert stats["errors"] == 3
+    assert stats["size"] is None
+    conn.close()
+
+def test_predict_survives_shared_cache_failure(tmp_path):
+    """/predict repond via le modele quand le cache partage est en erreur"""
+    cache = SharedPredictionCache(str(tmp_path / "cache.db"), str(tmp_path / "snap.db"))
+    conn = cache._conn
+    cache._conn = MagicMock()
+    cache._conn.execute.side_effect = sqlite3.OperationalError("database or disk is full")
+
+    predict_cached.cache_clear()
+    with patch('app.main.shared_cache', cache), patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.array([[0.2, 0.8]])
+        response = TestClient(app).post("/predict", json={
+            "CreditScore": 651, "Age": 35, "Tenure": 5, "Balance": 50000.0,
+            "NumOfProducts": 2, "HasCrCard": 1, "IsActiveMember": 1,
+            "EstimatedSalary": 75000.0, "Geography_Germany": 0, "Geography_Spain": 1
+        })
+    predict_cached.cache_clear()
+    assert response.status_code == 200
+    assert response.json()["risk_level"] == "High"
+    assert cache.errors == 2
+    conn.close()
@@ -0,0 +1,82 @@
+# tests/test_compression.py
+import sys
+import os
+import gzip
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.compression import MAX_DECOMPRESSED_BYTES
+
+client = TestClient(app)
+
+CUSTOMER = {
+    "CreditScore": 650, "Age": 35, "Tenure": 5, "Balance": 50000.0,
+    "NumOfProducts": 2, "HasCrCard": 1, "IsActiveMember": 1,
+    "EstimatedSalary": 75000.0, "Geography_Germany": 0, "Geography_Spain": 1
+}
+
+def post_compressed(body, encoding, **headers):
+    return client.post("/predict/batch", content=body, headers={
+        "Content-Type": "application/json", "Content-Encoding": encoding, **headers
+    })
+
+def test_gzip_batch_request_and_response():
+    """Corps gzip accepte ; la reponse volumineuse est compressee si demandee"""
+    batch = [CUSTOMER] * 200
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.side_effect = lambda X: np.tile([0.2, 0.8], (len(X), 1))
+        response = post_compressed(gzip.compress(json.dumps(batch).encode()), "gzip",
+                                   **{"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.json()["count"] == 200
+    assert response.headers["content-encoding"] == "gzip"
+
+def test_small_response_not_compressed():
+    """Les petites reponses (/predict) ne sont pas compressees"""
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.array([[0.8, 0.2]])
+        response = client.post("/predict", json=CUSTOMER, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+def test_zstd_batch_request():
+    """Corps zstd accepte si zstandard est installe"""
+    zstandard = pytest.importorskip("zstandard")
+    body = zstandard.ZstdCompressor().compress(json.dumps([CUSTOMER] * 10).encode())
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.side_effect = lambda X: np.tile([0.2, 0.8], (len(X), 1))
+        response = post_compressed(body, "zstd")
+    assert response.status_code == 200
+    assert response.json()["count"] == 10
+
+    assert post_compressed(body[:-5], "zstd").status_code == 400
+    bomb = zstandard.ZstdCompressor().compress(b" " * (MAX_DECOMPRESSED_BYTES + 1))
+    assert post_compressed(bomb, "zstd").status_code == 413
+
+def test_decompression_bomb_rejected():
+    """Un corps qui depasse la limite une fois decompresse est rejete (413)"""
+    bomb = gzip.compress(b" " * (MAX_DECOMPRESSED_BYTES + 1))
+    assert len(bomb) < MAX_DECOMPRESSED_BYTES // 100
+    assert post_compressed(bomb, "gzip").status_code == 413
+
+def test_predict_uses_its_own_decompressed_budget():
+    """Petit corps gzip sur /predict : 413 des qu'il depasse 64 Ko decompresse"""
+    bomb = gzip.compress(b" " * (128 * 1024))
+    assert len(bomb) < 1024
+    response = client.post("/predict", content=bomb, headers={
+        "Content-Type": "application/json", "Content-Encoding": "gzip"
+    })
+    assert response.status_code == 413
+
+def test_invalid_or_unsupported_encoding():
+    """Flux tronque -> 400, encodage inconnu -> 415"""
+    body = gzip.compress(json.dumps([CUSTOMER]).encode())
+    assert post_compressed(body[:-10], "gzip").status_code == 400
+    assert post_compressed(body, "br").status_code == 415
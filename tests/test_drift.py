@@ -0,0 +1,83 @@
+# tests/test_drift.py
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.stats import ks_2samp, wasserstein_distance, chi2_contingency
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.drift_detect import detect_drift
+
+def write_samples(tmp_path, n=2000):
+    rng = np.random.default_rng(0)
+    def sample(shift, p_card):
+        geo = rng.integers(0, 3, n)
+        return pd.DataFrame({
+            "Age": rng.normal(40 + shift, 10, n),
+            "HasCrCard": (rng.random(n) < p_card).astype(int),
+            "Geography_Germany": (geo == 1).astype(int),
+            "Geography_Spain": (geo == 2).astype(int),
+            "Exited": rng.integers(0, 2, n),
+        })
+    ref, prod = sample(0, 0.7), sample(3, 0.5)
+    ref.to_csv(tmp_path / "ref.csv", index=False)
+    prod.to_csv(tmp_path / "prod.csv", index=False)
+    return ref, prod
+
+def test_statistics_match_scipy(tmp_path):
+    """KS / Wasserstein sur les colonnes continues, chi-deux sur les binaires"""
+    ref, prod = write_samples(tmp_path)
+    results = detect_drift(tmp_path / "ref.csv", tmp_path / "prod.csv", output_dir=tmp_path / "reports")
+
+    age = results["Age"]
+    ks = ks_2samp(ref["Age"], prod["Age"], method="asymp")
+    assert age["test"] == "ks"
+    assert np.isclose(age["statistic"], ks.statistic)
+    assert np.isclose(age["p_value"], ks.pvalue)
+    assert np.isclose(age["wasserstein"], wasserstein_distance(ref["Age"], prod["Age"]))
+    assert age["drift_detected"]
+
+    card = results["HasCrCard"]
+    table = pd.crosstab(
+        np.r_[np.zeros(len(ref)), np.ones(len(prod))], np.r_[ref["HasCrCard"], prod["HasCrCard"]]
+    ).values
+    assert card["test"] == "chi2"
+    assert np.isclose(card["statistic"], chi2_contingency(table, correction=False)[0])
+    assert "Exited" not in results
+
+def test_segment_drift_by_geography(tmp_path):
+    """Le drift est aussi calcule par pays"""
+    ref, prod = write_samples(tmp_path)
+    results = detect_drift(tmp_path / "ref.csv", tmp_path / "prod.csv", output_dir=tmp_path / "reports")
+
+    segments = results["Age"]["segments"]
+    assert set(segments) == {"France", "Germany", "Spain"}
+    spain_ref = ref.loc[ref["Geography_Spain"] == 1, "Age"]
+    spain_prod = prod.loc[prod["Geography_Spain"] == 1, "Age"]
+    assert np.isclose(segments["Spain"]["statistic"], ks_2samp(spain_ref, spain_prod).statistic)
+    assert "segments" not in results["Geography_Spain"]
+
+def test_segmentation_disabled_when_production_lacks_segments(tmp_path):
+    """Production sans colonnes geographiques : drift global sans segments"""
+    ref, prod = write_samples(tmp_path)
+    prod.drop(columns=["Geography_Germany", "Geography_Spain"]).to_csv(tmp_path / "prod.csv", index=False)
+    results = detect_drift(tmp_path / "ref.csv", tmp_path / "prod.csv", output_dir=tmp_path / "reports")
+
+    assert results["Age"]["drift_detected"]
+    assert "segments" not in results["Age"]
+    assert "Geography_Spain" not in results
+
+def test_string_segment_column(tmp_path):
+    """Segment passe en colonne texte brute : segments par modalite, colonne non testee"""
+    ref, prod = write_samples(tmp_path)
+    for df, name in [(ref, "ref.csv"), (prod, "prod.csv")]:
+        df["Country"] = np.select([df["Geography_Germany"] == 1, df["Geography_Spain"] == 1],
+                                  ["Germany", "Spain"], "France")
+        df.to_csv(tmp_path / name, index=False)
+    results = detect_drift(tmp_path / "ref.csv", tmp_path / "prod.csv",
+                           output_dir=tmp_path / "reports", segment_by="Country")
+
+    assert "Country" not in results
+    assert set(results["Age"]["segments"]) == {"France", "Germany", "Spain"}
@@ -0,0 +1,113 @@
+# tests/test_feature_store.py
+import sys
+import os
+import subprocess
+import threading
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import FEATURE_COLUMNS
+from app.feature_store import FeatureStore, build
+
+client = TestClient(app)
+
+def make_customers(ids, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.integers(0, 2, len(ids)) for col in FEATURE_COLUMNS})
+    df["CreditScore"] = rng.uniform(350, 850, len(ids))
+    df["Balance"] = rng.uniform(0, 200000, len(ids))
+    df["CustomerId"] = ids
+    return df
+
+def test_gather_returns_model_matrix(tmp_path):
+    """Les lignes rassemblees correspondent aux features d'origine, dans l'ordre demande"""
+    df = make_customers(np.arange(1000, 1100) * 7)
+    store = build(df, str(tmp_path))
+
+    X, found = store.gather([1050 * 7, 12345, 1000 * 7])
+    assert found.tolist() == [True, False, True]
+    assert np.allclose(X[0], df.loc[50, FEATURE_COLUMNS].to_numpy(dtype=float))
+    assert np.allclose(X[2], df.loc[0, FEATURE_COLUMNS].to_numpy(dtype=float))
+    assert not X[1].any()
+    assert store.columns["HasCrCard"].dtype == np.int32
+
+def test_upsert_updates_in_place_and_grows(tmp_path):
+    """Mise a jour en place, ajout avec croissance, vue des autres lecteurs"""
+    build(make_customers(np.arange(20)), str(tmp_path))
+    reader = FeatureStore(str(tmp_path))
+
+    changed = make_customers(np.arange(10, 60), seed=1)
+    result = FeatureStore(str(tmp_path)).upsert(changed)
+    assert result == {"updated": 10, "inserted": 40}
+
+    assert len(reader) == 60
+    X, found = reader.gather(np.arange(10, 60))
+    assert found.all()
+    assert np.allclose(X, changed[FEATURE_COLUMNS].to_numpy(dtype=float))
+    assert reader.stats()["capacity"] >= 60
+
+def test_customer_endpoints(tmp_path):
+    """Scoring par identifiant, clients inconnus et mise a jour via l'API admin"""
+    store = build(make_customers(np.arange(5)), str(tmp_path))
+    with patch('app.main.model') as mock_model, \
+            patch('app.main.feature_store', store), \
+            patch('app.main.ADMIN_TOKEN', "secret"):
+        mock_model.predict_proba.side_effect = lambda X: np.tile([0.2, 0.8], (len(X), 1))
+
+        response = client.get("/customers/3/predict")
+        assert response.status_code == 200
+        assert response.json()["risk_level"] == "High"
+        assert client.get("/customers/99/predict").status_code == 404
+
+        response = client.post("/predict/customers", json={"customer_ids": [1, 99, 4]})
+        data = response.json()
+        assert [p["customer_id"] for p in data["predictions"]] == [1, 4]
+        assert data["not_found"] == [99]
+
+        record = {
+            "customer_id": 99, "CreditScore": 650, "Age": 35, "Tenure": 5, "Balance": 50000.0,
+            "NumOfProducts": 2, "HasCrCard": 1, "IsActiveMember": 1,
+            "EstimatedSalary": 75000.0, "Geography_Germany": 0, "Geography_Spain": 1
+        }
+        response = client.post("/admin/customers/upsert", json=[record],
+                               headers={"X-Admin-Token": "secret"})
+        assert response.json() == {"updated": 0, "inserted": 1}
+        assert client.get("/customers/99/predict").status_code == 200
+
+def test_gather_during_growing_upserts(tmp_path):
+    """Lectures concurrentes d'un meme objet pendant des ajouts qui agrandissent le store"""
+    store = build(make_customers(np.arange(16)), str(tmp_path))
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                X, found = store.gather(np.arange(0, 2000, 3))
+                assert found[:6].all()
+            except Exception as e:
+                errors.append(e)
+                return
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for start in range(16, 2000, 97):
+            store.upsert(make_customers(np.arange(start, start + 97), seed=start))
+    finally:
+        done.set()
+        thread.join()
+    assert not errors
+    assert len(store) == start + 97
+
+def test_import_without_fcntl():
+    """Le module (et donc l'API) se charge sur un hote sans fcntl"""
+    code = "import sys; sys.modules['fcntl'] = None; import app.feature_store"
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
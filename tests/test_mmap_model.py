@@ -0,0 +1,68 @@
+# tests/test_mmap_model.py
+import sys
+import os
+import json
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.cache import model_version
+from app.mmap_model import MmapForest, load_model, packed_path, resolve_model_path, save_model
+
+def make_data():
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 10)) * 100
+    y = (X[:, 0] + rng.normal(0, 20, 300) > 50).astype(int)
+    return X, y
+
+def test_mmap_forest_matches_sklearn(tmp_path):
+    """Le format mmap donne exactement les probabilites de scikit-learn"""
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    path = str(tmp_path / "churn_model.pkl")
+    save_model(model, path)
+
+    resolved = resolve_model_path(path)
+    assert resolved == packed_path(path)
+    assert model_version(resolved) == model_version(path)
+
+    packed = load_model(resolved)
+    assert isinstance(packed, MmapForest)
+    assert np.array_equal(packed.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(packed.predict(X[:5]), model.predict(X[:5]))
+
+def test_stale_or_unsupported_model_falls_back_to_pickle(tmp_path):
+    """Un repertoire mmap d'un autre modele n'est pas utilise"""
+    X, y = make_data()
+    path = str(tmp_path / "churn_model.pkl")
+    save_model(RandomForestClassifier(n_estimators=2).fit(X, y), path)
+    save_model(LogisticRegression().fit(X, y), path)
+
+    assert resolve_model_path(path) == path
+    assert isinstance(load_model(path), LogisticRegression)
+
+def test_missing_values_follow_sklearn(tmp_path):
+    """NaN : meme branche que scikit-learn, modele appris avec ou sans NaN"""
+    X, y = make_data()
+    X_nan = X.copy()
+    X_nan[np.random.default_rng(1).random(X.shape) < 0.1] = np.nan
+    for X_train in (X, X_nan):
+        model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X_train, y)
+        path = str(tmp_path / "churn_model.pkl")
+        save_model(model, path)
+        packed = load_model(resolve_model_path(path))
+        assert np.array_equal(packed.predict_proba(X_nan), model.predict_proba(X_nan))
+
+def test_old_format_version_falls_back_to_pickle(tmp_path):
+    X, y = make_data()
+    path = str(tmp_path / "churn_model.pkl")
+    save_model(RandomForestClassifier(n_estimators=2).fit(X, y), path)
+    meta_path = os.path.join(packed_path(path), "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(meta_path, "w") as f:
+        json.dump({**meta, "format_version": 1}, f)
+    assert resolve_model_path(path) == path
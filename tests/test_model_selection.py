@@ -0,0 +1,53 @@
+# tests/test_model_selection.py
+import sys
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model_selection import build_model, measure_latency, select_model
+
+# Latences simulees par famille : seule la selection est testee ici
+LATENCIES_MS = {
+    "RandomForestClassifier": 10.0,
+    "HistGradientBoostingClassifier": 1.0,
+    "Pipeline": 0.1,
+}
+
+def make_data(n=600):
+    """Cible non lineaire (XOR) : les arbres battent nettement la regression logistique"""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=["a", "b", "c", "d"])
+    y = ((X["a"] > 0) ^ (X["b"] > 0)).astype(int).to_numpy()
+    return X[:400], y[:400], X[400:], y[400:]
+
+def fake_latency(model, X):
+    return {"latency_p99_ms": LATENCIES_MS[type(model).__name__], "throughput_rows_per_s": 1000.0}
+
+def run_selection(budget_ms):
+    with patch('model_selection.mlflow'), patch('model_selection.measure_latency', fake_latency):
+        return select_model(*make_data(), latency_budget_ms=budget_ms, n_jobs=1)
+
+def test_best_auc_within_budget():
+    """La foret (meilleur AUC) depasse le budget : le boosting est retenu"""
+    name, model, params = run_selection(budget_ms=5)
+    assert name == "HistGradientBoosting"
+    assert params["max_iter"] == 200
+    assert run_selection(budget_ms=50)[0] in ("RandomForest", "HistGradientBoosting")
+
+def test_fastest_when_none_within_budget():
+    """Aucun modele dans le budget : le plus rapide est retenu"""
+    assert run_selection(budget_ms=0.01)[0] == "LogisticRegression"
+
+def test_measure_latency_keys():
+    """Latence et debit mesures pour une foret (format mmap) et un pipeline"""
+    X_train, y_train, X_test, _ = make_data()
+    for name in ("RandomForest", "LogisticRegression"):
+        model = build_model(name).fit(X_train, y_train)
+        metrics = measure_latency(model, X_test, n_single=20, n_bulk=500)
+        assert set(metrics) == {"latency_p99_ms", "throughput_rows_per_s"}
+        assert metrics["latency_p99_ms"] > 0
+        assert metrics["throughput_rows_per_s"] > 0
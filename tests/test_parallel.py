@@ -0,0 +1,54 @@
+# tests/test_parallel.py
+import sys
+import os
+from unittest.mock import patch
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.parallel import ParallelPredictor, workers_from_cmdline
+
+client = TestClient(app)
+
+TEST_CUSTOMER = {
+    "CreditScore": 650, "Age": 35, "Tenure": 5, "Balance": 50000.0,
+    "NumOfProducts": 2, "HasCrCard": 1, "IsActiveMember": 1,
+    "EstimatedSalary": 75000.0, "Geography_Germany": 0, "Geography_Spain": 1
+}
+
+def test_large_inputs_split_across_threads():
+    """Resultat identique en sequentiel et en parallele"""
+    rng = np.random.default_rng(0)
+    X = rng.random((500, 10))
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, rng.integers(0, 2, 500))
+    predictor = ParallelPredictor(threads=3, min_rows=100)
+    predictor.configure(model)
+
+    assert np.allclose(predictor.predict_proba(model, X[:50]), model.predict_proba(X[:50]))
+    assert np.allclose(predictor.predict_proba(model, X), model.predict_proba(X))
+    assert predictor.serial_calls == 1
+    assert predictor.parallel_calls == 1
+    assert model.n_jobs == 1
+    predictor.shutdown()
+
+def test_batch_uses_single_matrix():
+    """Le batch est predit en un seul appel a predict_proba"""
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.side_effect = lambda X: np.tile([0.3, 0.7], (len(X), 1))
+        response = client.post("/predict/batch", json=[TEST_CUSTOMER] * 3)
+        assert response.status_code == 200
+        assert response.json()["count"] == 3
+        assert mock_model.predict_proba.call_count == 1
+        assert response.json()["predictions"][0] == {"churn_probability": 0.7, "prediction": 1}
+
+def test_worker_count_from_supervisor_cmdline():
+    """--workers lu sur la ligne de commande uvicorn / gunicorn du superviseur"""
+    assert workers_from_cmdline(["/usr/bin/python", "/usr/bin/uvicorn", "app.main:app", "--workers", "4"]) == 4
+    assert workers_from_cmdline(["uvicorn", "app.main:app", "--workers=2"]) == 2
+    assert workers_from_cmdline(["gunicorn", "-w", "3", "-k", "uvicorn.workers.UvicornWorker"]) == 3
+    assert workers_from_cmdline(["uvicorn", "app.main:app"]) is None
+    assert workers_from_cmdline(["bash", "run.sh", "--workers", "8"]) is None
@@ -0,0 +1,53 @@
+# tests/test_profiler.py
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.profiler import _classify
+
+client = TestClient(app)
+
+def test_profile_requires_admin_token():
+    """Sans jeton valide l'endpoint est refuse"""
+    with patch('app.main.ADMIN_TOKEN', "secret"):
+        response = client.post("/admin/profile?seconds=0.1", headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 403
+
+def test_profile_returns_collapsed_stacks():
+    """Le profilage retourne des piles agregees et un resume"""
+    with patch('app.main.ADMIN_TOKEN', "secret"):
+        response = client.post("/admin/profile?seconds=0.3", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["summary"]["samples"] > 0
+        assert "predict_proba" in body["summary"]["time_split_pct"]
+        first_line = body["collapsed"].splitlines()[0]
+        assert first_line.rsplit(" ", 1)[1].isdigit()
+
+def test_classify_uses_nearest_frame_of_interest():
+    """json sous le cache -> caching, envoi socket -> other, rendu JSON -> serialization"""
+    endpoint = ["starlette/routing.py:handle", "fastapi/routing.py:app", "package/app/main.py:predict"]
+    assert _classify(endpoint + [
+        "package/app/main.py:hash_features", "python3.11/json/__init__.py:dumps",
+        "python3.11/json/encoder.py:encode",
+    ]) == "caching"
+    assert _classify(endpoint + [
+        "package/app/main.py:predict_cached", "python3.11/json/__init__.py:loads",
+    ]) == "caching"
+    assert _classify(endpoint + [
+        "package/app/main.py:predict_cached", "package/app/parallel.py:predict_proba",
+        "sklearn/ensemble/_forest.py:predict_proba", "sklearn/utils/validation.py:check_array",
+    ]) == "predict_proba"
+    assert _classify([
+        "fastapi/routing.py:app", "starlette/responses.py:render", "python3.11/json/__init__.py:dumps",
+    ]) == "serialization"
+    assert _classify([
+        "starlette/routing.py:handle", "starlette/responses.py:__call__",
+        "uvicorn/protocols/http/h11_impl.py:send", "asyncio/selector_events.py:write",
+    ]) == "other"
+    assert _classify(["threading.py:_bootstrap", "selectors.py:select"]) == "idle"
+    assert _classify(["package/app/cache.py:get"]) == "caching"
@@ -0,0 +1,94 @@
+# tests/test_training_cache.py
+import sys
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from training_cache import TrainingCache, cache_key, file_hash
+from train_model import parse_args, restore_cached_run, stage_keys, train
+
+def test_stage_roundtrip(tmp_path):
+    """Une etape enregistree est relue avec la meme cle, pas avec une autre"""
+    cache = TrainingCache(root=str(tmp_path))
+    key = cache_key("data-hash", {"test_size": 0.2})
+    plot = tmp_path / "plot.png"
+    plot.write_bytes(b"png")
+
+    assert not cache.has("split", key)
+    cache.save("split", key, {"meta.json": {"n": 3}, "idx.pkl": [0, 2]}, files=[str(plot)])
+
+    assert cache.has("split", key)
+    assert cache.load("split", key, "meta.json") == {"n": 3}
+    assert cache.load("split", key, "idx.pkl") == [0, 2]
+    assert not cache.has("split", cache_key("data-hash", {"test_size": 0.3}))
+
+def test_disabled_cache_never_hits(tmp_path):
+    cache = TrainingCache(root=str(tmp_path), enabled=False)
+    cache.save("fit", "k", {"fit.json": {}})
+    assert not cache.has("fit", "k")
+
+def write_dataset(path, n=300):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n, 3)), columns=["a", "b", "c"])
+    df["Exited"] = (df["a"] + rng.normal(0, 0.5, n) > 0).astype(int)
+    df.to_csv(path, index=False)
+
+def run(tmp_path, *argv):
+    args = parse_args(list(argv))
+    with patch('train_model.mlflow') as mock_mlflow, \
+            patch.dict('train_model.RF_PARAMS', {'n_estimators': 5}):
+        result = train(args, cache=TrainingCache(root=str(tmp_path / "cache")),
+                       data_path=str(tmp_path / "data.csv"), model_path="model/churn_model.pkl")
+    return result, mock_mlflow
+
+def test_eval_change_reuses_fit_then_full_hit(tmp_path, monkeypatch):
+    """Nouveau seuil : fit relu ; meme seuil ensuite : aucun entrainement, run cache_hit"""
+    monkeypatch.chdir(tmp_path)
+    write_dataset(tmp_path / "data.csv")
+
+    first, _ = run(tmp_path)
+    assert not first["cache_hit"] and not first["fit_reused"]
+
+    with patch('train_model.RandomForestClassifier') as mock_rf:
+        second, _ = run(tmp_path, "--decision-threshold", "0.3")
+        mock_rf.assert_not_called()
+    assert second["fit_reused"] and not second["cache_hit"]
+    assert second["params"]["decision_threshold"] == 0.3
+
+    os.remove("confusion_matrix.png")
+    third, mock_mlflow = run(tmp_path, "--decision-threshold", "0.3")
+    assert third["cache_hit"]
+    assert third["metrics"] == second["metrics"]
+    assert mock_mlflow.set_tags.call_args[0][0]["cache_hit"] == "true"
+    assert os.path.exists("confusion_matrix.png")
+    assert os.path.exists("model/churn_model.pkl")
+
+def test_cache_hit_removes_stale_plots(tmp_path, monkeypatch):
+    """Un modele sans feature_importances_ ne laisse pas le graphique d'un ancien run"""
+    monkeypatch.chdir(tmp_path)
+    write_dataset(tmp_path / "data.csv")
+    args = parse_args([])
+    cache = TrainingCache(root=str(tmp_path / "cache"))
+    _, fit_key, eval_key, _ = stage_keys(file_hash("data.csv"), args)
+    cache.save("fit", fit_key, {
+        "model.pkl": LogisticRegression().fit([[0], [1]], [0, 1]),
+        "fit.json": {"model_type": "LogisticRegression", "params": {}}
+    })
+    cache.save("eval", eval_key, {"result.json": {
+        "model_type": "LogisticRegression", "params": {}, "metrics": {"roc_auc": 0.9}
+    }})
+    (tmp_path / "feature_importance.png").write_bytes(b"stale")
+
+    with patch('train_model.mlflow'):
+        assert restore_cached_run(cache, fit_key, eval_key) is not None
+    assert not os.path.exists("feature_importance.png")
+
+def test_eval_hit_without_fit_entry_is_a_miss(tmp_path):
+    cache = TrainingCache(root=str(tmp_path))
+    cache.save("eval", "e", {"result.json": {}})
+    assert restore_cached_run(cache, "missing-fit", "e") is None
@@ -3,80 +3,152 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import (
-    accuracy_score, 
-    precision_score, 
+    accuracy_score,
+    precision_score,
     recall_score,
-    f1_score, 
+    f1_score,
     roc_auc_score,
     confusion_matrix
 )
-import joblib
 import mlflow
 import mlflow.sklearn
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import argparse
+from app.mmap_model import save_model
+from training_cache import (
+    TrainingCache, cache_key, code_version, file_hash, library_versions
+)
 
-# Configuration MLflow : dossier local "mlruns" dans ton projet
-mlflow.set_tracking_uri("file:./mlruns")
-mlflow.set_experiment("bank-churn-prediction")
+DATA_PATH = "data/bank_churn.csv"
+MODEL_PATH = "model/churn_model.pkl"
+PLOT_FILES = ["confusion_matrix.png", "feature_importance.png"]
+RF_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'random_state': 42
+}
 
 
-print("Chargement des donnees...")
-df = pd.read_csv("data/bank_churn.csv")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Entrainement du modele de churn")
+    parser.add_argument(
+        "--select-model", action="store_true",
+        help="Compare plusieurs familles de modeles et retient la meilleure sous budget de latence"
+    )
+    parser.add_argument(
+        "--latency-budget-ms", type=float,
+        default=float(os.getenv("LATENCY_BUDGET_MS", "5")),
+        help="Latence p99 maximale pour une prediction unitaire (ms)"
+    )
+    parser.add_argument(
+        "--decision-threshold", type=float, default=0.5,
+        help="Seuil de probabilite pour la classe churn lors de l'evaluation"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Ignore le cache d'entrainement et recalcule toutes les etapes"
+    )
+    return parser.parse_args(argv)
 
-print(f"Dataset : {len(df)} lignes, {len(df.columns)} colonnes")
-print(f"Taux de churn : {df['Exited'].mean():.2%}")
 
-# Separation features/target
-X = df.drop('Exited', axis=1)
-y = df['Exited']
+def stage_keys(data_hash, args):
+    """Cles du cache des etapes split, fit et evaluation, et reglages du fit"""
+    split_settings = {"test_size": 0.2, "random_state": 42, "stratify": True}
+    split_key = cache_key(data_hash, split_settings)
+    if args.select_model:
+        fit_settings = {"mode": "select", "latency_budget_ms": args.latency_budget_ms}
+    else:
+        fit_settings = {"mode": "random-forest", "params": RF_PARAMS}
+    fit_key = cache_key(split_key, fit_settings, code_version(), library_versions())
+    eval_key = cache_key(fit_key, {"decision_threshold": args.decision_threshold})
+    return split_key, fit_key, eval_key, fit_settings
 
-# Split train/test (80/20)
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
 
-print(f"\nTrain : {len(X_train)} lignes")
-print(f"Test : {len(X_test)} lignes")
-
-# Entrainement avec MLflow tracking
-print("\nEntrainement du modele...")
-with mlflow.start_run(run_name="random-forest-v1"):
-    
-    # Parametres du modele
-    params = {
-        'n_estimators': 100,
-        'max_depth': 10,
-        'min_samples_split': 5,
-        'random_state': 42
-    }
-    
-    # Entrainement
-    model = RandomForestClassifier(**params)
-    model.fit(X_train, y_train)
-    
-    # Predictions
-    y_pred = model.predict(X_test)
-    y_proba = model.predict_proba(X_test)[:, 1]
-    
-    # Calcul des metriques
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
-    auc = roc_auc_score(y_test, y_proba)
-    
-    # Log des parametres et metriques dans MLflow
-    mlflow.log_params(params)
-    mlflow.log_metrics({
-        "accuracy": accuracy,
-        "precision": precision,
-        "recall": recall,
-        "f1_score": f1,
-        "roc_auc": auc
+def split_data(cache, split_key, y):
+    """Split train/test (80/20), indices reutilises si le dataset n'a pas change"""
+    if cache.has("split", split_key):
+        return cache.load("split", split_key, "train_idx.pkl"), cache.load("split", split_key, "test_idx.pkl")
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=0.2, random_state=42, stratify=y
+    )
+    cache.save("split", split_key, {"train_idx.pkl": train_idx, "test_idx.pkl": test_idx})
+    return train_idx, test_idx
+
+
+def restore_cached_run(cache, fit_key, eval_key, model_path=MODEL_PATH):
+    """
+    Resultat complet deja calcule : modele, metriques et graphiques relus,
+    run MLflow marque cache_hit. Retourne None si l'une des etapes manque.
+    """
+    if not (cache.has("eval", eval_key) and cache.has("fit", fit_key)):
+        return None
+
+    result = cache.load("eval", eval_key, "result.json")
+    model = cache.load("fit", fit_key, "model.pkl")
+    # Pas de graphique d'un run precedent pour un modele qui n'en produit pas
+    for name in PLOT_FILES:
+        if os.path.exists(name):
+            os.remove(name)
+    cache.restore_files("eval", eval_key, PLOT_FILES)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    save_model(model, model_path)
+
+    with mlflow.start_run(run_name=f"{result['model_type']}-cache-hit"):
+        mlflow.log_params(result["params"])
+        mlflow.log_metrics(result["metrics"])
+        mlflow.set_tags({
+            "environment": "development",
+            "model_type": result["model_type"],
+            "task": "binary_classification",
+            "cache_hit": "true",
+            "cache_key": eval_key
+        })
+    return result
+
+
+def fit_model(cache, fit_key, fit_settings, args, X_train, y_train, X_test, y_test):
+    """Retourne (type, modele, parametres, relu depuis le cache)"""
+    if cache.has("fit", fit_key):
+        # Meme donnees, parametres et code : seul le fit est reutilise
+        print("Modele relu depuis le cache d'entrainement")
+        fitted = cache.load("fit", fit_key, "fit.json")
+        return fitted["model_type"], cache.load("fit", fit_key, "model.pkl"), fitted["params"], True
+
+    if args.select_model:
+        # Entrainement de plusieurs familles et selection sous budget de latence
+        from model_selection import select_model
+        model_type, model, params = select_model(
+            X_train, y_train, X_test, y_test, args.latency_budget_ms
+        )
+        print(f"\nModele retenu : {model_type}")
+    else:
+        params = fit_settings["params"]
+        model_type = "RandomForest"
+        model = RandomForestClassifier(**params)
+        model.fit(X_train, y_train)
+
+    cache.save("fit", fit_key, {
+        "model.pkl": model,
+        "fit.json": {"model_type": model_type, "params": params}
     })
-    
+    return model_type, model, params, False
+
+
+def evaluate(model, X_test, y_test, decision_threshold, feature_names):
+    """Metriques sur le jeu de test, matrice de confusion et importance des features"""
+    y_proba = model.predict_proba(X_test)[:, 1]
+    y_pred = (y_proba > decision_threshold).astype(int)
+    metrics = {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred),
+        "recall": recall_score(y_test, y_pred),
+        "f1_score": f1_score(y_test, y_pred),
+        "roc_auc": roc_auc_score(y_test, y_proba)
+    }
+
     # Creation et sauvegarde de la matrice de confusion
     cm = confusion_matrix(y_test, y_pred)
     plt.figure(figsize=(8, 6))
@@ -86,48 +158,125 @@ with mlflow.start_run(run_name="random-forest-v1"):
     plt.xlabel('Classe Predite')
     plt.savefig('confusion_matrix.png')
     plt.close()
-    
-    # Feature importance
-    feature_importance = pd.DataFrame({
-        'feature': X.columns,
-        'importance': model.feature_importances_
-    }).sort_values('importance', ascending=False)
-    
-    plt.figure(figsize=(10, 6))
-    plt.barh(feature_importance['feature'], feature_importance['importance'])
-    plt.xlabel('Importance')
-    plt.title('Feature Importance')
-    plt.tight_layout()
-    plt.savefig('feature_importance.png')
-    plt.close()
-    
-    # Enregistrement du modele dans MLflow (disabled due to permission issues)
-    # mlflow.sklearn.log_model(
-    #     model,
-    #     "model",
-    #     registered_model_name="bank-churn-classifier"
-    # )
-    
-    # Sauvegarde locale du modele
-    joblib.dump(model, "model/churn_model.pkl")
-    
-    # Tags MLflow (syntaxe corrigee)
-    mlflow.set_tags({
-        "environment": "development",
-        "model_type": "RandomForest",
-        "task": "binary_classification"
-    })
-    
+
+    # Feature importance (seulement pour les modeles a base d'arbres qui l'exposent)
+    if hasattr(model, 'feature_importances_'):
+        feature_importance = pd.DataFrame({
+            'feature': feature_names,
+            'importance': model.feature_importances_
+        }).sort_values('importance', ascending=False)
+
+        plt.figure(figsize=(10, 6))
+        plt.barh(feature_importance['feature'], feature_importance['importance'])
+        plt.xlabel('Importance')
+        plt.title('Feature Importance')
+        plt.tight_layout()
+        plt.savefig('feature_importance.png')
+        plt.close()
+    elif os.path.exists('feature_importance.png'):
+        os.remove('feature_importance.png')
+    return metrics
+
+
+def train(args, cache=None, data_path=DATA_PATH, model_path=MODEL_PATH):
+    """
+    Entraine (ou relit depuis le cache) le modele et l'enregistre dans model_path.
+    Retourne un resume : type de modele, metriques, cache_hit et fit_reused.
+    """
+    # Cache d'entrainement : chaque etape est indexee par un hash de ses entrees
+    if cache is None:
+        cache = TrainingCache(enabled=not args.no_cache)
+    split_key, fit_key, eval_key, fit_settings = stage_keys(file_hash(data_path), args)
+
+    print("Chargement des donnees...")
+    df = pd.read_csv(data_path)
+
+    print(f"Dataset : {len(df)} lignes, {len(df.columns)} colonnes")
+    print(f"Taux de churn : {df['Exited'].mean():.2%}")
+
+    # Separation features/target
+    X = df.drop('Exited', axis=1)
+    y = df['Exited']
+
+    train_idx, test_idx = split_data(cache, split_key, y)
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+
+    print(f"\nTrain : {len(X_train)} lignes")
+    print(f"Test : {len(X_test)} lignes")
+
+    result = restore_cached_run(cache, fit_key, eval_key, model_path)
+    if result is not None:
+        print("\nCache d'entrainement trouve, aucun re-entrainement necessaire")
+        print(f"ROC AUC   : {result['metrics']['roc_auc']:.4f}")
+        print(f"\nModele sauvegarde dans : {model_path}")
+        return {**result, "cache_hit": True, "fit_reused": True}
+
+    # Entrainement avec MLflow tracking
+    print("\nEntrainement du modele...")
+    run_name = "model-selection" if args.select_model else "random-forest-v1"
+    with mlflow.start_run(run_name=run_name):
+        model_type, model, params, fit_reused = fit_model(
+            cache, fit_key, fit_settings, args, X_train, y_train, X_test, y_test
+        )
+        metrics = evaluate(model, X_test, y_test, args.decision_threshold, X.columns)
+
+        # Log des parametres et metriques dans MLflow
+        mlflow.log_params(params)
+        mlflow.log_param("decision_threshold", args.decision_threshold)
+        mlflow.log_metrics(metrics)
+
+        # Enregistrement du modele dans MLflow (disabled due to permission issues)
+        # mlflow.sklearn.log_model(
+        #     model,
+        #     "model",
+        #     registered_model_name="bank-churn-classifier"
+        # )
+
+        # Sauvegarde locale du modele (pickle + format mmap pour les forets)
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        save_model(model, model_path)
+
+        # Tags MLflow (syntaxe corrigee)
+        mlflow.set_tags({
+            "environment": "development",
+            "model_type": model_type,
+            "task": "binary_classification",
+            "cache_hit": "false",
+            "cache_key": eval_key
+        })
+        result = {
+            "model_type": model_type,
+            "params": {**params, "decision_threshold": args.decision_threshold},
+            "metrics": metrics
+        }
+        cache.save("eval", eval_key, {"result.json": result},
+                   files=[f for f in PLOT_FILES if os.path.exists(f)])
+
     # Affichage des resultats
     print("\n" + "="*50)
     print("RESULTATS DE L'ENTRAINEMENT")
     print("="*50)
-    print(f"Accuracy  : {accuracy:.4f}")
-    print(f"Precision : {precision:.4f}")
-    print(f"Recall    : {recall:.4f}")
-    print(f"F1 Score  : {f1:.4f}")
-    print(f"ROC AUC   : {auc:.4f}")
+    print(f"Accuracy  : {metrics['accuracy']:.4f}")
+    print(f"Precision : {metrics['precision']:.4f}")
+    print(f"Recall    : {metrics['recall']:.4f}")
+    print(f"F1 Score  : {metrics['f1_score']:.4f}")
+    print(f"ROC AUC   : {metrics['roc_auc']:.4f}")
     print("="*50)
-    
-    print(f"\nModele sauvegarde dans : model/churn_model.pkl")
+
+    print(f"\nModele sauvegarde dans : {model_path}")
     print(f"MLflow UI : mlflow ui --port 5000")
+    return {**result, "cache_hit": False, "fit_reused": fit_reused}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Configuration MLflow : dossier local "mlruns" dans ton projet
+    mlflow.set_tracking_uri("file:./mlruns")
+    mlflow.set_experiment("bank-churn-prediction")
+    train(args)
+
+
+if __name__ == "__main__":
+    main()
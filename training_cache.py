@@ -0,0 +1,104 @@
+"""
+Cache adresse par contenu pour train_model.py.
+
+Chaque etape (split, fit, evaluation) est stockee dans .train_cache/<etape>/<cle>/
+ou la cle est un hash de tout ce qui determine son resultat : contenu du
+dataset, parametres, version du code d'entrainement et versions des
+librairies. Une etape dont la cle n'a pas change est relue au lieu d'etre
+recalculee ; un changement des seuls reglages d'evaluation ne refait pas
+le fit.
+"""
+import os
+import json
+import shutil
+import hashlib
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+TRAIN_CACHE_DIR = os.getenv("TRAIN_CACHE_DIR", ".train_cache")
+CODE_FILES = ["train_model.py", "model_selection.py", "training_cache.py"]
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version():
+    """Hash des sources du pipeline d'entrainement"""
+    digest = hashlib.sha256()
+    for path in CODE_FILES:
+        if os.path.exists(path):
+            digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def library_versions():
+    return {
+        "scikit-learn": sklearn.__version__,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "joblib": joblib.__version__,
+    }
+
+
+def cache_key(*parts):
+    """Cle d'une etape a partir d'elements serialisables en JSON"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class TrainingCache:
+    def __init__(self, root=TRAIN_CACHE_DIR, enabled=True):
+        self.root = root
+        self.enabled = enabled
+
+    def path(self, stage, key):
+        return os.path.join(self.root, stage, key)
+
+    def has(self, stage, key):
+        return self.enabled and os.path.exists(os.path.join(self.path(stage, key), "DONE"))
+
+    def save(self, stage, key, objects=None, files=None):
+        """
+        Enregistre une etape : objets Python (joblib/JSON) et fichiers copies.
+        Le marqueur DONE n'est ecrit qu'a la fin pour ignorer les etapes incompletes.
+        """
+        if not self.enabled:
+            return
+        target = self.path(stage, key)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, value in (objects or {}).items():
+            if name.endswith(".json"):
+                with open(os.path.join(tmp, name), "w") as f:
+                    json.dump(value, f, indent=2)
+            else:
+                joblib.dump(value, os.path.join(tmp, name))
+        for path in files or []:
+            if os.path.exists(path):
+                shutil.copy2(path, os.path.join(tmp, os.path.basename(path)))
+        open(os.path.join(tmp, "DONE"), "w").close()
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+
+    def load(self, stage, key, name):
+        path = os.path.join(self.path(stage, key), name)
+        if name.endswith(".json"):
+            with open(path) as f:
+                return json.load(f)
+        return joblib.load(path)
+
+    def restore_files(self, stage, key, names, destination="."):
+        """Recopie les fichiers d'une etape (graphiques) dans le repertoire courant"""
+        for name in names:
+            source = os.path.join(self.path(stage, key), name)
+            if os.path.exists(source):
+                shutil.copy2(source, os.path.join(destination, name))